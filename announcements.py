@@ -0,0 +1,153 @@
+import os
+import json
+import asyncio
+import logging
+import aiofiles
+from dotenv import load_dotenv
+from telegram.error import BadRequest
+from outbound import send_priority, PRIORITY_ANNOUNCEMENT
+
+load_dotenv('.env')
+
+ANNOUNCE_TOKEN_VIDEO = os.getenv('ANNOUNCE_TOKEN_VIDEO', 'glimmer.mp4')
+ANNOUNCE_JACKPOT_VIDEO = os.getenv('ANNOUNCE_JACKPOT_VIDEO', 'radiant.mp4')
+ANNOUNCE_FILE_IDS = os.getenv('ANNOUNCE_FILE_IDS', 'video_file_ids.json')
+ANNOUNCE_COALESCE_WINDOW = float(os.getenv('ANNOUNCE_COALESCE_WINDOW', 3))
+ANNOUNCE_DIGEST_MAX = int(os.getenv('ANNOUNCE_DIGEST_MAX', 10))
+ANNOUNCE_DRAIN_TIMEOUT = float(os.getenv('ANNOUNCE_DRAIN_TIMEOUT', 30))
+CAPTION_LIMIT = 1024
+FILE_ID_ERRORS = ("file identifier", "file_id", "remote file", "wrong type of the web page content")
+
+def _video_key(path):
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+def is_file_id_error(error):
+    message = str(error).lower()
+    return any(marker in message for marker in FILE_ID_ERRORS)
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def format_digest(captions):
+    header = f"🎉 *{len(captions)} shards just broke!*\n\n"
+    caption = header
+    for n, text in enumerate(captions):
+        entry = text.strip() + "\n\n"
+        if len(caption) + len(entry) > CAPTION_LIMIT - 20:
+            return caption + f"…and {len(captions) - n} more"
+        caption += entry
+    return caption.rstrip()
+
+class AnnouncementQueue:
+    def __init__(self, coalesce_window=ANNOUNCE_COALESCE_WINDOW, digest_max=ANNOUNCE_DIGEST_MAX, file_ids_path=ANNOUNCE_FILE_IDS):
+        self.coalesce_window = coalesce_window
+        self.digest_max = digest_max
+        self.file_ids_path = file_ids_path
+        self.bot = None
+        self.chat_id = None
+        self._file_ids = {}
+        self._queue = None
+        self._worker = None
+
+    async def _load_file_ids(self):
+        try:
+            async with aiofiles.open(self.file_ids_path, 'r') as f:
+                self._file_ids = json.loads(await f.read())
+        except FileNotFoundError:
+            self._file_ids = {}
+        except ValueError as e:
+            logging.error(f"Ignoring unreadable {self.file_ids_path}: {e}")
+            self._file_ids = {}
+
+    async def _save_file_ids(self):
+        temp_path = f"{self.file_ids_path}.{os.getpid()}.tmp"
+        async with aiofiles.open(temp_path, 'w') as f:
+            await f.write(json.dumps(self._file_ids, indent=2))
+        os.replace(temp_path, self.file_ids_path)
+
+    async def start(self, bot, chat_id):
+        self.bot = bot
+        self.chat_id = chat_id
+        await self._load_file_ids()
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    def announce(self, caption, jackpot=False):
+        if self._queue is None:
+            logging.error("Announcement dropped, queue not started")
+            return
+        self._queue.put_nowait((caption, jackpot))
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.coalesce_window
+        while len(batch) < self.digest_max:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._publish(batch)
+            except Exception as e:
+                logging.error(f"Failed to post {len(batch)} announcement(s): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _publish(self, batch):
+        captions = [caption for caption, _ in batch]
+        jackpot = any(is_jackpot for _, is_jackpot in batch)
+        caption = captions[0] if len(captions) == 1 else format_digest(captions)
+        await self._send_video(ANNOUNCE_JACKPOT_VIDEO if jackpot else ANNOUNCE_TOKEN_VIDEO, caption)
+
+    async def _send_video(self, path, caption):
+        key = await asyncio.to_thread(_video_key, path)
+        file_id = self._file_ids.get(key)
+        with send_priority(PRIORITY_ANNOUNCEMENT):
+            if file_id:
+                try:
+                    await self.bot.send_video(chat_id=self.chat_id, video=file_id, caption=caption, parse_mode="Markdown")
+                    return
+                except BadRequest as e:
+                    if not is_file_id_error(e):
+                        raise
+                    logging.error(f"Cached file_id for {path} rejected, uploading again: {e}")
+                    self._file_ids.pop(key, None)
+            data = await asyncio.to_thread(_read_bytes, path)
+            message = await self.bot.send_video(
+                chat_id=self.chat_id,
+                video=data,
+                filename=os.path.basename(path),
+                caption=caption,
+                parse_mode="Markdown"
+            )
+        if message.video:
+            self._file_ids[key] = message.video.file_id
+            await self._save_file_ids()
+
+    async def close(self):
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), ANNOUNCE_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.error(f"Dropping {self._queue.qsize()} unsent announcement(s) at shutdown")
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+announcement_queue = AnnouncementQueue()
+
+def announce(caption, jackpot=False):
+    announcement_queue.announce(caption, jackpot)
@@ -1,27 +1,16 @@
-import os
-import requests
-from dotenv import load_dotenv
-load_dotenv('.env')
+from rpc import rpc_call, RPCError
 
-RPC_URL2 = os.getenv('INSERT_RPC')
 
+async def get_lamports(wallet_address):
+    result = await rpc_call("getBalance", [wallet_address])
+    return result["value"]
 
 async def get_balance(wallet_address):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getBalance",
-        "params": [wallet_address]
-    }
-    headers = {"Content-Type": "application/json"}
-    response = requests.post(RPC_URL2, json=payload, headers=headers)
-    if response.ok:
-        lamports = response.json()["result"]["value"]
+    try:
+        lamports = await get_lamports(wallet_address)
         sol_balance = lamports / 1000000000
         return sol_balance
-    else:
+    except RPCError as e:
         sol_balance = 0
-        print("Error:", response.status_code, response.text)
+        print("Error:", e)
         return sol_balance
-
-
@@ -0,0 +1,48 @@
+import db
+from bench.fake_rpc import random_pubkey
+
+async def get_user_id(wallet_address):
+    async with db.cursor() as cursor:
+        await cursor.execute("SELECT user_id FROM players WHERE wallet_address = %s LIMIT 1", (wallet_address,))
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+async def get_wallet_address(user_id):
+    async with db.cursor() as cursor:
+        await cursor.execute("SELECT wallet_address FROM players WHERE user_id = %s", (user_id,))
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+async def get_wallet_address_by_user_id(user_id):
+    return await get_wallet_address(user_id)
+
+async def get_game_wallet(table):
+    async with db.cursor() as cursor:
+        await cursor.execute(f"SELECT wallet_address FROM {table} ORDER BY id LIMIT 1")
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+async def generate_wallet_if_needed(cursor, table):
+    await cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    if (await cursor.fetchone())[0] == 0:
+        await cursor.execute(f"INSERT INTO {table} (wallet_address) VALUES (%s)", (random_pubkey(),))
+
+async def save_wallet_address_new(user_id, wallet_address, earned, private_key, round_, referrer_id, credit_balance):
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            '''
+            INSERT INTO players (user_id, wallet_address, earned, referrer_id, credit_balance)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE wallet_address = VALUES(wallet_address)
+            ''',
+            (user_id, wallet_address, earned, referrer_id, credit_balance)
+        )
+
+async def save_wallet_address(user_id, wallet_address, private_key=None):
+    async with db.cursor() as cursor:
+        await cursor.execute("UPDATE players SET wallet_address = %s WHERE user_id = %s", (wallet_address, user_id))
+
+async def get_total_users():
+    async with db.cursor() as cursor:
+        await cursor.execute("SELECT COUNT(*) FROM players")
+        return (await cursor.fetchone())[0]
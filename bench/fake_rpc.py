@@ -0,0 +1,94 @@
+import os
+import base58
+import random
+import asyncio
+import itertools
+from collections import Counter
+from aiohttp import web
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+def random_pubkey(rng=None):
+    data = bytes(rng.getrandbits(8) for _ in range(32)) if rng is not None else os.urandom(32)
+    return base58.b58encode(data).decode()
+
+class FakeSolanaRPC:
+    def __init__(self, latency=0.05, jitter=0.5, failure_rate=0.0, lamports=10**9, shard_balance=0, mint=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.lamports = lamports
+        self.shard_balance = shard_balance
+        self.mint = mint
+        self.calls = Counter()
+        self.failures = Counter()
+        self.url = None
+        self._random = random.Random(seed)
+        self._slots = itertools.count(1)
+        self._runner = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        app = web.Application()
+        app.router.add_post('/', self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}/"
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def _signature(self):
+        return "".join(self._random.choice(BASE58_ALPHABET) for _ in range(88))
+
+    def _result(self, method, params):
+        context = {"slot": next(self._slots)}
+        if method == "getBalance":
+            return {"context": context, "value": self.lamports}
+        if method == "getTokenAccountsByOwner":
+            if not self.shard_balance:
+                return {"context": context, "value": []}
+            token_amount = {"amount": str(self.shard_balance * 10**6), "decimals": 6, "uiAmount": float(self.shard_balance), "uiAmountString": str(self.shard_balance)}
+            return {"context": context, "value": [{
+                "pubkey": "11111111111111111111111111111111",
+                "account": {"data": {"parsed": {"info": {"tokenAmount": token_amount}}}}
+            }]}
+        if method == "getMultipleAccounts":
+            account = {"lamports": 2039280, "data": {"parsed": {"info": {"mint": self.mint}}}} if self.mint else None
+            return {"context": context, "value": [account for _ in params[0]]}
+        if method == "getSignatureStatuses":
+            return {"context": context, "value": [
+                {"slot": context["slot"], "confirmations": None, "err": None, "confirmationStatus": "finalized"}
+                for _ in params[0]
+            ]}
+        if method == "getLatestBlockhash":
+            return {"context": context, "value": {"blockhash": "11111111111111111111111111111111", "lastValidBlockHeight": context["slot"] + 150}}
+        if method == "sendTransaction":
+            return self._signature()
+        return None
+
+    def _respond(self, payload):
+        method = payload.get("method")
+        self.calls[method] += 1
+        response = {"jsonrpc": "2.0", "id": payload.get("id")}
+        if self._random.random() < self.failure_rate:
+            self.failures[method] += 1
+            response["error"] = {"code": -32005, "message": "Node is behind"}
+            return response
+        result = self._result(method, payload.get("params") or [])
+        if result is None:
+            response["error"] = {"code": -32601, "message": "Method not found"}
+        else:
+            response["result"] = result
+        return response
+
+    async def handle(self, request):
+        payload = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency * self._random.uniform(1 - self.jitter, 1 + self.jitter))
+        if isinstance(payload, list):
+            return web.json_response([self._respond(item) for item in payload])
+        return web.json_response(self._respond(payload))
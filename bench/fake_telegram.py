@@ -0,0 +1,77 @@
+import json
+import time
+import asyncio
+import itertools
+from collections import Counter
+from aiohttp import web
+
+BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Bench",
+    "username": "bench_bot",
+    "can_join_groups": False,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": False
+}
+
+MESSAGE_METHODS = {"sendMessage", "sendVideo", "sendPhoto", "editMessageText", "editMessageReplyMarkup", "editMessageCaption"}
+
+class FakeTelegram:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.url = None
+        self._message_ids = itertools.count(1)
+        self._runner = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}/bot"
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _params(self, request):
+        if request.content_type == 'application/json':
+            return await request.json()
+        params = {}
+        for key, value in (await request.post()).items():
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            params[key] = value
+        return params
+
+    def _message(self, params):
+        chat_id = int(params.get("chat_id", 0))
+        message_id = params.get("message_id") or next(self._message_ids)
+        return {
+            "message_id": int(message_id),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "channel"},
+            "text": params.get("text") or params.get("caption") or ""
+        }
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        params = await self._params(request)
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method == "getMe":
+            result = BOT_USER
+        elif method in MESSAGE_METHODS:
+            result = self._message(params)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
@@ -0,0 +1,233 @@
+import os
+import sys
+import math
+import time
+import random
+import asyncio
+import argparse
+import importlib
+import itertools
+import contextvars
+from collections import defaultdict
+from telegram import Update
+from bench.fake_telegram import FakeTelegram
+from bench.fake_rpc import FakeSolanaRPC, random_pubkey
+
+PLAYER_ID_BASE = 10_000_000
+PERCENTILES = (50, 95, 99)
+
+current_flow = contextvars.ContextVar("current_flow", default=None)
+current_interaction = contextvars.ContextVar("current_interaction", default=None)
+
+STAGES = [
+    ("main", "get_balance", "balance_check"),
+    ("main", "send_sol_e", "payment"),
+    ("main", "send_sol_e_r", "payment"),
+    ("transfer", "confirm_transaction", "confirmation"),
+    ("main", "send_sol", "prize"),
+    ("main", "queue_spl_payout", "prize"),
+    ("main", "add_credits", "prize"),
+    ("main", "store_entry", "store_entry"),
+    ("main", "get_solana_token_amount", "spl_balance"),
+    ("main", "get_credits", "credits"),
+    ("main", "get_jackpot_balance", "jackpot"),
+    ("main", "start", "render"),
+]
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    def timed(self, stage, func):
+        recorder = self
+        async def wrapper(*args, **kwargs):
+            flow = current_flow.get()
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                recorder.record(f"{flow}.{stage}" if flow else stage, time.perf_counter() - started)
+                if stage == "render":
+                    interaction = current_interaction.get()
+                    if interaction is not None and not interaction.done():
+                        interaction.set_result(None)
+        return wrapper
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+def configure_environment(telegram, rpc, rng):
+    from spl.token.constants import TOKEN_PROGRAM_ID
+    os.environ["TELEGRAM_API_URL"] = telegram.url
+    os.environ["INSERT_RPC"] = rpc.url
+    os.environ.setdefault("SOLANA_RPC_URL", rpc.url)
+    os.environ.setdefault("TOKEN_MINT_ADDRESS", random_pubkey(rng))
+    os.environ.setdefault("TOKEN_PROGRAM_ID", str(TOKEN_PROGRAM_ID))
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:bench")
+    os.environ.setdefault("TELEGRAM_CHANNEL_ID", "-1000000000001")
+    os.environ.setdefault("DATABASE_NAME", "shards_bench")
+    os.environ.setdefault("STATE_BACKEND", "memory")
+    os.environ.setdefault("METRICS_PORT", "0")
+
+def install_dbcalls():
+    try:
+        importlib.import_module("dbcalls")
+    except ModuleNotFoundError as e:
+        if e.name != "dbcalls":
+            raise
+        sys.modules["dbcalls"] = importlib.import_module("bench.fake_dbcalls")
+
+async def seed_players(count, rng):
+    dbcalls = importlib.import_module("dbcalls")
+    for n in range(count):
+        user_id = PLAYER_ID_BASE + n
+        wallet = random_pubkey(rng)
+        if await dbcalls.get_wallet_address(user_id):
+            await dbcalls.save_wallet_address(user_id, wallet_address=wallet, private_key=None)
+        else:
+            await dbcalls.save_wallet_address_new(user_id, wallet, 0, None, 0, None, 0)
+
+def instrument(recorder):
+    for module_name, attribute, stage in STAGES:
+        module = importlib.import_module(module_name)
+        setattr(module, attribute, recorder.timed(stage, getattr(module, attribute)))
+
+class Players:
+    def __init__(self, application, recorder, timeout):
+        self.application = application
+        self.recorder = recorder
+        self.timeout = timeout
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _user(self, user_id):
+        return {"id": user_id, "is_bot": False, "first_name": f"Player {user_id}"}
+
+    def _chat(self, user_id):
+        return {"id": user_id, "type": "private"}
+
+    def start_update(self, user_id):
+        return {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": self._chat(user_id),
+                "from": self._user(user_id),
+                "text": "/start",
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}]
+            }
+        }
+
+    def grid_update(self, user_id, row, col):
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(user_id),
+                "chat_instance": str(user_id),
+                "data": f"grid_{row},{col}",
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": self._chat(user_id),
+                    "text": "menu"
+                }
+            }
+        }
+
+    async def interact(self, flow, data):
+        interaction = asyncio.get_running_loop().create_future()
+        flow_token = current_flow.set(flow)
+        interaction_token = current_interaction.set(interaction)
+        started = time.perf_counter()
+        try:
+            await self.application.process_update(Update.de_json(data, self.application.bot))
+            await asyncio.wait_for(interaction, self.timeout)
+            self.recorder.record(f"{flow}.total", time.perf_counter() - started)
+        except Exception:
+            self.recorder.errors[flow] += 1
+        finally:
+            current_interaction.reset(interaction_token)
+            current_flow.reset(flow_token)
+
+    async def play(self, user_id, rounds, rng, size):
+        await self.interact("start", self.start_update(user_id))
+        for _ in range(rounds):
+            await self.interact("grid", self.grid_update(user_id, rng.randrange(size), rng.randrange(size)))
+
+def print_report(recorder, elapsed, telegram, rpc):
+    print(f"Elapsed: {elapsed:.2f}s")
+    for flow in ("start", "grid"):
+        completed = len(recorder.samples.get(f"{flow}.total", []))
+        print(f"{flow}: {completed} completed, {recorder.errors[flow]} failed, {completed / elapsed:.2f}/s")
+    print(f"{'stage':<28}{'count':>8}" + "".join(f"{f'p{p} ms':>12}" for p in PERCENTILES))
+    for stage in sorted(recorder.samples):
+        samples = recorder.samples[stage]
+        print(f"{stage:<28}{len(samples):>8}" + "".join(f"{percentile(samples, p) * 1000:>12.1f}" for p in PERCENTILES))
+    print("RPC calls: " + ", ".join(f"{method}={count}" for method, count in sorted(rpc.calls.items())))
+    if rpc.failures:
+        print("RPC injected failures: " + ", ".join(f"{method}={count}" for method, count in sorted(rpc.failures.items())))
+    print("Telegram calls: " + ", ".join(f"{method}={count}" for method, count in sorted(telegram.calls.items())))
+
+async def run(args):
+    telegram = await FakeTelegram(latency=args.telegram_latency_ms / 1000).start()
+    rpc = FakeSolanaRPC(
+        latency=args.rpc_latency_ms / 1000,
+        jitter=args.rpc_jitter,
+        failure_rate=args.rpc_failure_rate,
+        lamports=int(args.sol_balance * 10**9),
+        shard_balance=args.shard_balance,
+        seed=args.seed
+    )
+    await rpc.start()
+    rng = random.Random(args.seed)
+    configure_environment(telegram, rpc, rng)
+    install_dbcalls()
+    main = importlib.import_module("main")
+    from token_accounts import MINT_ADDRESS
+    from game_rules import GAME_CONFIG
+    rpc.mint = MINT_ADDRESS
+    recorder = Recorder()
+    instrument(recorder)
+    application = main.build_application()
+    try:
+        async with application:
+            await application.post_init(application)
+            await main.until_ready()
+            await seed_players(args.players, rng)
+            players = Players(application, recorder, args.timeout)
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                players.play(PLAYER_ID_BASE + n, args.rounds, random.Random(rng.random()), GAME_CONFIG["grid"]["size"])
+                for n in range(args.players)
+            ))
+            elapsed = time.perf_counter() - started
+            await application.post_stop(application)
+        await application.post_shutdown(application)
+    finally:
+        await telegram.stop()
+        await rpc.stop()
+    print_report(recorder, elapsed, telegram, rpc)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /start and grid_ flows against local Telegram and Solana fakes")
+    parser.add_argument("--players", type=int, default=50, help="concurrent simulated players")
+    parser.add_argument("--rounds", type=int, default=3, help="grid plays per player after /start")
+    parser.add_argument("--rpc-latency-ms", type=float, default=50, help="mean fake RPC response latency")
+    parser.add_argument("--rpc-jitter", type=float, default=0.5, help="latency spread as a fraction of the mean")
+    parser.add_argument("--rpc-failure-rate", type=float, default=0.0, help="fraction of RPC requests answered with an error")
+    parser.add_argument("--telegram-latency-ms", type=float, default=30, help="fake Bot API response latency")
+    parser.add_argument("--sol-balance", type=float, default=1.0, help="SOL balance reported for every wallet")
+    parser.add_argument("--shard-balance", type=int, default=0, help="SHARD balance reported for every wallet")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before an interaction counts as failed")
+    parser.add_argument("--seed", type=int, default=None)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import os
+import time
+import asyncio
+import logging
+import metrics
+from dotenv import load_dotenv
+from rpc import rpc_call, RPCError, RPCResponseError
+
+load_dotenv('.env')
+
+CONFIRM_COMMITMENT = os.getenv('CONFIRM_COMMITMENT', 'confirmed')
+CONFIRM_TIMEOUT = float(os.getenv('CONFIRM_TIMEOUT', 60))
+CONFIRM_MIN_INTERVAL = float(os.getenv('CONFIRM_MIN_INTERVAL', 0.4))
+CONFIRM_MAX_INTERVAL = float(os.getenv('CONFIRM_MAX_INTERVAL', 3))
+MAX_SIGNATURES_PER_CALL = 256
+INVALID_PARAMS = -32602
+
+COMMITMENT_LEVELS = {"processed": 0, "confirmed": 1, "finalized": 2}
+
+confirmation_seconds = metrics.Histogram("shards_confirmation_seconds", "Time from submitting a signature to its confirmation outcome", ("outcome",))
+
+class ConfirmationService:
+    def __init__(self, commitment=CONFIRM_COMMITMENT, min_interval=CONFIRM_MIN_INTERVAL, max_interval=CONFIRM_MAX_INTERVAL):
+        self.required_level = COMMITMENT_LEVELS[commitment]
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._interval = min_interval
+        self._pending = {}
+        self._task = None
+
+    async def wait(self, signature, timeout=CONFIRM_TIMEOUT):
+        future = self._pending.get(signature)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[signature] = future
+        self._interval = self.min_interval
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        started = time.perf_counter()
+        try:
+            confirmed = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if self._pending.get(signature) is future:
+                del self._pending[signature]
+            confirmed = None
+        confirmation_seconds.observe(time.perf_counter() - started, outcome="timeout" if confirmed is None else "confirmed" if confirmed else "failed")
+        return bool(confirmed)
+
+    def _reached(self, status):
+        level = COMMITMENT_LEVELS.get(status.get("confirmationStatus"))
+        if level is None:
+            return status.get("confirmations") is None
+        return level >= self.required_level
+
+    def _resolve(self, signature, confirmed):
+        future = self._pending.pop(signature, None)
+        if future is not None and not future.done():
+            future.set_result(confirmed)
+
+    async def _statuses(self, chunk):
+        try:
+            result = await rpc_call("getSignatureStatuses", [chunk, {"searchTransactionHistory": False}])
+        except RPCResponseError as e:
+            if e.code != INVALID_PARAMS:
+                logging.error(f"Error confirming transactions: {str(e)}")
+                return []
+            if len(chunk) == 1:
+                return [(chunk[0], {"err": str(e)})]
+            half = len(chunk) // 2
+            return await self._statuses(chunk[:half]) + await self._statuses(chunk[half:])
+        except RPCError as e:
+            logging.error(f"Error confirming transactions: {str(e)}")
+            return []
+        statuses = result.get("value") if isinstance(result, dict) else None
+        if not isinstance(statuses, list) or len(statuses) != len(chunk):
+            logging.error(f"Malformed getSignatureStatuses result: {result}")
+            return []
+        return list(zip(chunk, statuses))
+
+    async def _poll(self, signatures):
+        resolved = 0
+        for i in range(0, len(signatures), MAX_SIGNATURES_PER_CALL):
+            for signature, status in await self._statuses(signatures[i:i + MAX_SIGNATURES_PER_CALL]):
+                if not isinstance(status, dict):
+                    continue
+                if status.get("err") is not None:
+                    logging.error(f"Transaction {signature} failed: {status['err']}")
+                    self._resolve(signature, False)
+                    resolved += 1
+                elif self._reached(status):
+                    self._resolve(signature, True)
+                    resolved += 1
+        return resolved
+
+    async def _run(self):
+        while self._pending:
+            await asyncio.sleep(self._interval)
+            if not self._pending:
+                break
+            try:
+                resolved = await self._poll(list(self._pending))
+            except Exception as e:
+                logging.error(f"Confirmation poll failed: {e}")
+                resolved = 0
+            if resolved:
+                self._interval = self.min_interval
+            else:
+                self._interval = min(self._interval * 1.5, self.max_interval)
+
+confirmation_service = ConfirmationService()
+
+async def confirm_transaction(signature, timeout=CONFIRM_TIMEOUT):
+    return await confirmation_service.wait(str(signature), timeout)
@@ -0,0 +1,146 @@
+import os
+import asyncio
+import logging
+import aiomysql
+import db
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+CREDIT_CAS_RETRIES = int(os.getenv('CREDIT_CAS_RETRIES', 10))
+CREDIT_RESERVATION_TTL = int(os.getenv('CREDIT_RESERVATION_TTL', 600))
+CREDIT_SWEEP_INTERVAL = float(os.getenv('CREDIT_SWEEP_INTERVAL', 300))
+ER_DUP_ENTRY = 1062
+
+class CreditConflictError(Exception):
+    pass
+
+class InsufficientCreditsError(Exception):
+    pass
+
+class ReservationClosedError(Exception):
+    pass
+
+async def _read(cursor, user_id):
+    await cursor.execute("SELECT balance, reserved, version FROM credit_balances WHERE user_id = %s", (user_id,))
+    return await cursor.fetchone() or (0, 0, None)
+
+async def _apply(user_id, kind, reference, change, closes=None):
+    for _ in range(CREDIT_CAS_RETRIES):
+        async with db.acquire() as conn:
+            async with conn.cursor() as cursor:
+                balance, reserved, version = await _read(cursor, user_id)
+                new_balance, new_reserved = change(balance, reserved)
+                await conn.begin()
+                try:
+                    if version is None:
+                        await cursor.execute(
+                            "INSERT IGNORE INTO credit_balances (user_id, balance, reserved, version) VALUES (%s, %s, %s, 1)",
+                            (user_id, new_balance, new_reserved)
+                        )
+                    else:
+                        await cursor.execute(
+                            '''
+                            UPDATE credit_balances
+                            SET balance = %s, reserved = %s, version = version + 1
+                            WHERE user_id = %s AND version = %s
+                            ''',
+                            (new_balance, new_reserved, user_id, version)
+                        )
+                    if cursor.rowcount != 1:
+                        await conn.rollback()
+                        continue
+                    await cursor.execute(
+                        '''
+                        INSERT INTO credit_ledger (user_id, kind, amount, reserved_delta, reference, closes)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        ''',
+                        (user_id, kind, new_balance - balance, new_reserved - reserved, reference, closes)
+                    )
+                    entry_id = cursor.lastrowid
+                    await conn.commit()
+                    return entry_id
+                except aiomysql.IntegrityError as e:
+                    await conn.rollback()
+                    if closes is not None and e.args[0] == ER_DUP_ENTRY:
+                        raise ReservationClosedError(f"Reservation {closes} for {user_id} is already closed") from e
+                    raise
+                except Exception:
+                    await conn.rollback()
+                    raise
+    raise CreditConflictError(f"Credit balance for {user_id} kept changing, gave up after {CREDIT_CAS_RETRIES} attempts")
+
+async def get_credits(user_id):
+    async with db.cursor() as cursor:
+        balance, reserved, _ = await _read(cursor, user_id)
+        return balance - reserved
+
+async def add_credits(user_id, amount, kind='prize', reference=None):
+    amount = int(amount)
+    return await _apply(user_id, kind, reference, lambda balance, reserved: (balance + amount, reserved))
+
+async def reserve_credits(user_id, minimum=1):
+    reserved_amount = None
+    def change(balance, reserved):
+        nonlocal reserved_amount
+        reserved_amount = balance - reserved
+        if reserved_amount < minimum:
+            raise InsufficientCreditsError(f"User {user_id} has {reserved_amount} credits available, needs {minimum}")
+        return balance, reserved + reserved_amount
+    reservation_id = await _apply(user_id, 'reserve', None, change)
+    return reservation_id, reserved_amount
+
+async def settle_credits(user_id, reservation_id, amount):
+    try:
+        await _apply(user_id, 'settle', str(reservation_id), lambda balance, reserved: (balance - amount, reserved - amount), closes=reservation_id)
+    except ReservationClosedError:
+        logging.error(f"Reservation {reservation_id} for {user_id} expired before it was settled, debiting {amount} credits directly")
+        await _apply(user_id, 'settle', str(reservation_id), lambda balance, reserved: (balance - amount, reserved))
+
+async def release_credits(user_id, reservation_id, amount, kind='release'):
+    await _apply(user_id, kind, str(reservation_id), lambda balance, reserved: (balance, reserved - amount), closes=reservation_id)
+
+async def expire_reservations(max_age=CREDIT_RESERVATION_TTL):
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            '''
+            SELECT r.id, r.user_id, r.reserved_delta
+            FROM credit_ledger r
+            LEFT JOIN credit_ledger c ON c.closes = r.id
+            WHERE r.kind = 'reserve' AND c.id IS NULL AND r.created_at < NOW() - INTERVAL %s SECOND
+            ''',
+            (max_age,)
+        )
+        stale = await cursor.fetchall()
+    for reservation_id, user_id, amount in stale:
+        logging.error(f"Expiring reservation {reservation_id}: {amount} credits for {user_id} were never settled or released")
+        try:
+            await release_credits(user_id, reservation_id, amount, kind='expire')
+        except ReservationClosedError:
+            pass
+
+async def sweep_reservations(interval=CREDIT_SWEEP_INTERVAL):
+    while True:
+        try:
+            await expire_reservations()
+        except Exception as e:
+            logging.error(f"Error expiring credit reservations: {e}")
+        await asyncio.sleep(interval)
+
+async def backfill_credits(cursor):
+    await cursor.execute("SELECT 1 FROM credit_ledger LIMIT 1")
+    if await cursor.fetchone():
+        return
+    await cursor.execute("START TRANSACTION")
+    try:
+        await cursor.execute(
+            "INSERT INTO credit_ledger (user_id, kind, amount) SELECT user_id, 'opening', FLOOR(credit_balance) FROM players WHERE credit_balance >= 1"
+        )
+        await cursor.execute(
+            "INSERT INTO credit_balances (user_id, balance, version) SELECT user_id, FLOOR(credit_balance), 1 FROM players WHERE credit_balance >= 1"
+        )
+        await cursor.execute("COMMIT")
+    except Exception as e:
+        logging.error(f"Error backfilling credit ledger: {e}")
+        await cursor.execute("ROLLBACK")
+        raise
@@ -0,0 +1,103 @@
+import os
+import time
+import asyncio
+import logging
+import aiomysql
+import metrics
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+DB_NAME = os.getenv('DATABASE_NAME')
+DB_HOST = os.getenv('DATABASE_HOST')
+DB_USER = os.getenv('DATABASE_USER')
+DB_PASSWORD = os.getenv('DATABASE_PASSWORD')
+DB_POOL_MIN = int(os.getenv('DATABASE_POOL_MIN', 2))
+DB_POOL_MAX = int(os.getenv('DATABASE_POOL_MAX', 20))
+DB_POOL_RECYCLE = int(os.getenv('DATABASE_POOL_RECYCLE', 3600))
+DB_PING_AFTER = float(os.getenv('DATABASE_PING_AFTER', 30))
+
+_pool = None
+_pool_lock = None
+
+pool_wait_seconds = metrics.Histogram(
+    "shards_db_pool_wait_seconds",
+    "Time spent waiting for a pooled MySQL connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+pool_in_use = metrics.Gauge("shards_db_pool_in_use", "Pooled MySQL connections currently checked out")
+
+pool_stats = {
+    "acquires": 0,
+    "wait_total": 0.0,
+    "wait_max": 0.0,
+    "pings": 0,
+    "reconnects": 0,
+}
+
+async def init_pool():
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                host=DB_HOST,
+                user=DB_USER,
+                password=DB_PASSWORD,
+                db=DB_NAME,
+                autocommit=True,
+                minsize=DB_POOL_MIN,
+                maxsize=DB_POOL_MAX,
+                pool_recycle=DB_POOL_RECYCLE
+            )
+    return _pool
+
+async def close_pool():
+    global _pool, _pool_lock
+    pool = _pool
+    _pool = None
+    _pool_lock = None
+    if pool is not None:
+        pool.close()
+        await pool.wait_closed()
+
+@asynccontextmanager
+async def acquire():
+    pool = await init_pool()
+    started = time.monotonic()
+    async with pool.acquire() as conn:
+        waited = time.monotonic() - started
+        pool_stats["acquires"] += 1
+        pool_stats["wait_total"] += waited
+        pool_stats["wait_max"] = max(pool_stats["wait_max"], waited)
+        pool_wait_seconds.observe(waited)
+        if asyncio.get_running_loop().time() - conn.last_usage > DB_PING_AFTER:
+            pool_stats["pings"] += 1
+            try:
+                await conn.ping(reconnect=False)
+            except Exception as e:
+                logging.error(f"Stale MySQL connection, reconnecting: {e}")
+                pool_stats["reconnects"] += 1
+                await conn.ping(reconnect=True)
+        pool_in_use.inc()
+        try:
+            yield conn
+        finally:
+            pool_in_use.dec()
+
+@asynccontextmanager
+async def cursor():
+    async with acquire() as conn:
+        async with conn.cursor() as cur:
+            yield cur
+
+def get_pool_stats():
+    stats = dict(pool_stats)
+    stats["wait_avg"] = stats["wait_total"] / stats["acquires"] if stats["acquires"] else 0.0
+    stats["size"] = _pool.size if _pool is not None else 0
+    stats["free"] = _pool.freesize if _pool is not None else 0
+    return stats
@@ -0,0 +1,152 @@
+import os
+import json
+import asyncio
+import logging
+import datetime
+import aiofiles
+import db
+import metrics
+from stats import apply_stats
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+ENTRY_FLUSH_SIZE = int(os.getenv('ENTRY_FLUSH_SIZE', 50))
+ENTRY_FLUSH_INTERVAL = float(os.getenv('ENTRY_FLUSH_INTERVAL', 1))
+ENTRY_SPILL_FILE = os.getenv('ENTRY_SPILL_FILE', 'game_entries.spill.jsonl')
+ENTRY_RETRY_MAX = float(os.getenv('ENTRY_RETRY_MAX', 60))
+
+INSERT_ENTRIES = '''
+    INSERT INTO game_entries (game_id, user_id, user_wallet, choice, grid, reward_success, prize_amount, prize_type, timestamp)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE game_id = game_id
+'''
+
+entry_collisions = metrics.Counter("shards_entry_collisions_total", "Buffered game entries not stored because their game_id was already taken")
+
+def worker_spill_file(worker_index, spill_file=ENTRY_SPILL_FILE):
+    if not worker_index:
+        return spill_file
+    root, ext = os.path.splitext(spill_file)
+    return f"{root}.{worker_index}{ext}"
+
+def _encode(row):
+    return json.dumps(row[:-1] + (row[-1].isoformat(),))
+
+def _decode(line):
+    row = json.loads(line)
+    return tuple(row[:-1]) + (datetime.datetime.fromisoformat(row[-1]),)
+
+async def _stored(cursor, rows):
+    await cursor.execute(
+        f"SELECT game_id, user_id FROM game_entries WHERE game_id IN ({', '.join(['%s'] * len(rows))}) FOR UPDATE",
+        [row[0] for row in rows]
+    )
+    return dict(await cursor.fetchall())
+
+class EntryBuffer:
+    def __init__(self, flush_size=ENTRY_FLUSH_SIZE, flush_interval=ENTRY_FLUSH_INTERVAL, spill_file=ENTRY_SPILL_FILE):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.spill_file = spill_file
+        self._pending = {}
+        self._flushing = {}
+        self._spilled = {}
+        self._timer = None
+        self._retry_delay = 0
+        self._lock = None
+        self._tasks = set()
+
+    async def load_spill(self):
+        try:
+            async with aiofiles.open(self.spill_file, 'r') as f:
+                async for line in f:
+                    if line.strip():
+                        row = _decode(line)
+                        self._spilled[row[0]] = row
+        except FileNotFoundError:
+            pass
+
+    def add(self, game_id, user_id, user_wallet, choice, grid, reward_success, prize_amount=0, prize_type=None):
+        timestamp = datetime.datetime.now().replace(microsecond=0)
+        self._pending[game_id] = (game_id, user_id, user_wallet, choice, json.dumps(grid), reward_success, prize_amount, prize_type, timestamp)
+        if len(self._pending) >= self.flush_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._schedule_flush)
+
+    def get(self, game_id):
+        return self._pending.get(game_id) or self._flushing.get(game_id) or self._spilled.get(game_id)
+
+    def rows(self):
+        return list(self._spilled.values()) + list(self._flushing.values()) + list(self._pending.values())
+
+    def _schedule_flush(self):
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._flushing, self._pending = self._pending, {}
+            rows = list(self._spilled.values()) + list(self._flushing.values())
+            if not rows:
+                return
+            try:
+                async with db.acquire() as conn:
+                    await conn.begin()
+                    try:
+                        async with conn.cursor() as cursor:
+                            stored = await _stored(cursor, rows)
+                            new_rows = [row for row in rows if row[0] not in stored]
+                            collisions = [
+                                row[0] for row in rows
+                                if row[0] in stored and (row[0] not in self._spilled or stored[row[0]] != row[1])
+                            ]
+                            if new_rows:
+                                await cursor.executemany(INSERT_ENTRIES, new_rows)
+                                if cursor.rowcount < len(new_rows):
+                                    raise RuntimeError(f"only {cursor.rowcount} of {len(new_rows)} game entries were inserted")
+                                await apply_stats(cursor, new_rows)
+                        await conn.commit()
+                    except Exception:
+                        await conn.rollback()
+                        raise
+            except Exception as e:
+                logging.error(f"Error flushing {len(rows)} game entries, spilling to {self.spill_file}: {e}")
+                self._spilled.update(self._flushing)
+                async with aiofiles.open(self.spill_file, 'a') as f:
+                    await f.write("".join(_encode(row) + "\n" for row in self._flushing.values()))
+                    await f.flush()
+                    await asyncio.to_thread(os.fsync, f.fileno())
+                self._retry_delay = min(ENTRY_RETRY_MAX, self._retry_delay * 2 or self.flush_interval)
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(self._retry_delay, self._schedule_flush)
+            else:
+                self._retry_delay = 0
+                if collisions:
+                    entry_collisions.inc(len(collisions))
+                    logging.error(f"{len(collisions)} game entries were not stored, their game_id is already taken: {collisions}")
+                if self._spilled:
+                    self._spilled = {}
+                    try:
+                        os.remove(self.spill_file)
+                    except FileNotFoundError:
+                        pass
+            finally:
+                self._flushing = {}
+
+    async def close(self):
+        await self.flush()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+entry_buffer = EntryBuffer()
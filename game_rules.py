@@ -0,0 +1,15 @@
+GAME_CONFIG = {
+    "grid": {"size": 5, "entry_fee": 0.03, "nft_count": 1, "token_count": 5, "token_prize": 25000}
+}
+
+TOKEN_PRIZE_OPTIONS = [50000, 25000, 12500, 5000, 5000]
+
+JACKPOT_CHANCE = 0.2
+JACKPOT_PAYOUT = 0.5
+
+JACKPOT_SHARE = 0.9
+JACKPOT_SHARE_REFERRAL = 0.8
+REFERRAL_SHARE = 0.1
+
+REFERRAL_MILESTONE = 10
+REFERRAL_MILESTONE_REWARD = 10000
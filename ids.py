@@ -0,0 +1,68 @@
+import os
+import asyncio
+import logging
+import db
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+GAME_ID_BLOCK_SIZE = int(os.getenv('GAME_ID_BLOCK_SIZE', 100))
+
+class IdAllocator:
+    def __init__(self, name, block_size=GAME_ID_BLOCK_SIZE, low_water=None):
+        self.name = name
+        self.block_size = block_size
+        self.low_water = low_water if low_water is not None else max(1, block_size // 5)
+        self._next = 0
+        self._limit = 0
+        self._reserved = None
+        self._refill = None
+
+    async def seed(self, first_id):
+        async with db.cursor() as cursor:
+            await cursor.execute(
+                '''
+                INSERT INTO id_blocks (name, next_id)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE next_id = GREATEST(next_id, VALUES(next_id))
+                ''',
+                (self.name, first_id)
+            )
+
+    async def _reserve(self):
+        async with db.cursor() as cursor:
+            await cursor.execute(
+                "UPDATE id_blocks SET next_id = LAST_INSERT_ID(next_id + %s) WHERE name = %s",
+                (self.block_size, self.name)
+            )
+            if cursor.rowcount != 1:
+                raise LookupError(f"No id block row for {self.name}")
+            end = cursor.lastrowid
+        self._reserved = (end - self.block_size, end)
+
+    def _refilled(self, task):
+        if self._refill is task:
+            self._refill = None
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Failed to reserve a {self.name} id block: {task.exception()}")
+
+    def _start_refill(self):
+        if self._refill is None or self._refill.done():
+            self._refill = asyncio.create_task(self._reserve())
+            self._refill.add_done_callback(self._refilled)
+        return self._refill
+
+    async def next_id(self):
+        while self._next >= self._limit:
+            if self._reserved is None:
+                await asyncio.shield(self._start_refill())
+            if self._reserved is not None and self._next >= self._limit:
+                self._next, self._limit = self._reserved
+                self._reserved = None
+        game_id = self._next
+        self._next += 1
+        if self._reserved is None and self._limit - self._next <= self.low_water:
+            self._start_refill()
+        return game_id
+
+game_ids = IdAllocator("game_entries")
@@ -0,0 +1,79 @@
+import os
+import time
+import asyncio
+from dotenv import load_dotenv
+from balance import get_lamports
+from dbcalls import get_game_wallet
+
+load_dotenv('.env')
+
+JACKPOT_TABLE = "game_grid"
+JACKPOT_CACHE_TTL = float(os.getenv('JACKPOT_CACHE_TTL', 10))
+
+class CachedValue:
+    def __init__(self, loader, ttl=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.value = None
+        self.loaded_at = 0.0
+        self._generation = 0
+        self._inflight = None
+
+    def _is_fresh(self):
+        if self.value is None:
+            return False
+        return self.ttl is None or time.monotonic() - self.loaded_at < self.ttl
+
+    async def get(self, fresh=False):
+        if not fresh and self._is_fresh():
+            return self.value
+        if fresh:
+            return await self._load(self._generation)
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._load(self._generation))
+            self._inflight.add_done_callback(self._clear_inflight)
+        return await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, future):
+        if self._inflight is future:
+            self._inflight = None
+
+    async def _load(self, generation):
+        value = await self.loader()
+        if generation == self._generation:
+            self.value = value
+            self.loaded_at = time.monotonic()
+        return value
+
+    def adjust(self, delta):
+        self._generation += 1
+        self._inflight = None
+        if self.value is not None:
+            self.value += delta
+
+    def invalidate(self):
+        self._generation += 1
+        self._inflight = None
+        self.value = None
+
+_wallet = CachedValue(lambda: get_game_wallet(JACKPOT_TABLE))
+
+async def _load_balance():
+    return await get_lamports(await _wallet.get()) / 1000000000
+
+_balance = CachedValue(_load_balance, ttl=JACKPOT_CACHE_TTL)
+
+async def get_jackpot_wallet():
+    return await _wallet.get()
+
+async def get_jackpot_balance(fresh=False):
+    return await _balance.get(fresh=fresh)
+
+def peek_jackpot_balance():
+    return _balance.value
+
+def adjust_jackpot_balance(delta):
+    _balance.adjust(delta)
+
+def invalidate_jackpot_balance():
+    _balance.invalidate()
@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+import metrics
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+LOOP_WATCHDOG = os.getenv('LOOP_WATCHDOG', '0') == '1'
+LOOP_STALL_THRESHOLD = float(os.getenv('LOOP_STALL_THRESHOLD_MS', 100)) / 1000
+LOOP_HEARTBEAT_INTERVAL = float(os.getenv('LOOP_HEARTBEAT_INTERVAL_MS', 50)) / 1000
+LOOP_REPORT_INTERVAL = float(os.getenv('LOOP_REPORT_INTERVAL', 300))
+LOOP_REPORT_TOP = int(os.getenv('LOOP_REPORT_TOP', 10))
+LOOP_STACK_DEPTH = int(os.getenv('LOOP_STACK_DEPTH', 8))
+UNKNOWN_STACK = ("<stall ended before its stack was captured>",)
+
+loop_lag_seconds = metrics.Histogram(
+    "shards_loop_lag_seconds",
+    "Event loop scheduling lag measured by the watchdog heartbeat",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+loop_stalls = metrics.Counter("shards_loop_stalls_total", "Event loop stalls longer than the watchdog threshold")
+
+class Offender:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+class LoopWatchdog:
+    def __init__(self, threshold=LOOP_STALL_THRESHOLD, interval=LOOP_HEARTBEAT_INTERVAL, report_interval=LOOP_REPORT_INTERVAL, top=LOOP_REPORT_TOP, depth=LOOP_STACK_DEPTH):
+        self.threshold = threshold
+        self.interval = interval
+        self.report_interval = report_interval
+        self.top = top
+        self.depth = depth
+        self.offenders = {}
+        self._beat = 0
+        self._beat_at = time.monotonic()
+        self._captured = None
+        self._loop_thread_id = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._tasks = []
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat_at = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        self._tasks = [asyncio.create_task(self._heartbeat()), asyncio.create_task(self._report_periodically())]
+
+    async def stop(self):
+        self._stop.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+        self.report()
+
+    def _stack_of_loop(self):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return UNKNOWN_STACK
+        return tuple(traceback.format_list(traceback.extract_stack(frame)[-self.depth:]))
+
+    def _monitor(self):
+        while not self._stop.wait(self.threshold / 4):
+            beat = self._beat
+            if self._captured is None and time.monotonic() - self._beat_at > self.interval + self.threshold:
+                self._captured = (beat, self._stack_of_loop())
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - self._beat_at - self.interval)
+            loop_lag_seconds.observe(lag)
+            captured, self._captured = self._captured, None
+            if lag > self.threshold:
+                stack = captured[1] if captured is not None and captured[0] == self._beat else UNKNOWN_STACK
+                self._record(stack, lag)
+            self._beat += 1
+            self._beat_at = now
+
+    def _record(self, stack, stalled):
+        loop_stalls.inc()
+        offender = self.offenders.get(stack)
+        if offender is None:
+            offender = self.offenders[stack] = Offender()
+            logging.error(f"Event loop blocked for {stalled * 1000:.0f} ms at:\n{''.join(stack)}")
+        offender.count += 1
+        offender.total += stalled
+        offender.max = max(offender.max, stalled)
+
+    def top_offenders(self):
+        return sorted(self.offenders.items(), key=lambda item: item[1].total, reverse=True)[:self.top]
+
+    def report(self):
+        if not self.offenders:
+            return
+        lines = [f"Event loop stall report, top {self.top} by total stalled time:"]
+        for rank, (stack, offender) in enumerate(self.top_offenders(), start=1):
+            lines.append(f"#{rank}: {offender.count} stalls, {offender.total:.3f}s total, {offender.max * 1000:.0f} ms max")
+            lines.append("".join(stack).rstrip())
+        logging.error("\n".join(lines))
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.report()
+
+loop_watchdog = LoopWatchdog()
@@ -1,39 +1,51 @@
 import os
 import math
 import time
-import boto3
-import base58
 import random
 import asyncio
 import logging
-import aiomysql
 import warnings
-import threading
 import json
 import aiofiles
 import datetime
-import pymysql.cursors
+import functools
+import db
+import rpc
+from retry import retry_async
+import metrics
+import migrations
 from dotenv import load_dotenv
 from transfer import send_sol, send_sol_e, send_sol_e_r
+from game_rules import GAME_CONFIG, TOKEN_PRIZE_OPTIONS, JACKPOT_CHANCE, JACKPOT_PAYOUT, JACKPOT_SHARE, JACKPOT_SHARE_REFERRAL, REFERRAL_SHARE
+from jackpot import get_jackpot_wallet, get_jackpot_balance, peek_jackpot_balance, adjust_jackpot_balance, invalidate_jackpot_balance
 from balance import get_balance
 from spl_balance import get_solana_token_amount
-from sendSPL import send_spl
-from solders.keypair import Keypair
+from payouts import queue_spl_payout, payout_queue
+from entry_buffer import entry_buffer, worker_spill_file
+from ids import game_ids
+from state import state_store
+from render import INFO_MESSAGE, RESULT_TEMPLATE, grid_key, format_start_message, start_markup, result_markup, format_grid_display, format_history_page, history_markup, parse_history_cursor, format_stats, format_leaderboard
+from referrals import record_referral, get_referrer, credit_referral_earnings
+from credits import get_credits, add_credits, reserve_credits, settle_credits, release_credits, sweep_reservations, InsufficientCreditsError
+from stats import get_user_stats, get_global_stats, get_leaderboard
+from cache import LRUCache
+from metrics import StageTimer
+from announcements import announcement_queue, announce
+from loopwatch import loop_watchdog, LOOP_WATCHDOG
+from outbound import PriorityRateLimiter, send_priority, current_priority, PRIORITY_RESULT, PRIORITY_MENU
 import telegram
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, Bot
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, CallbackContext, ContextTypes
-from telegram.error import TimedOut, BadRequest
+from telegram.error import TimedOut, BadRequest, TelegramError
 
 from dbcalls import (
     get_user_id,
     get_wallet_address_by_user_id,
     get_game_wallet,
-    generate_wallet_if_needed,
     save_wallet_address_new,
     get_wallet_address,
     get_total_users,
-    save_wallet_address,
-    decrement_user_credit_balance
+    save_wallet_address
 )
 
 warnings.simplefilter("ignore")
@@ -41,29 +53,28 @@ load_dotenv('.env')
 logging.basicConfig(level=logging.ERROR)
 
 TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-DB_NAME = os.getenv('DATABASE_NAME')
-DB_HOST = os.getenv('DATABASE_HOST')
-DB_USER = os.getenv('DATABASE_USER')
-DB_PASSWORD = os.getenv('DATABASE_PASSWORD')
 CHANNELID = int(os.getenv('TELEGRAM_CHANNEL_ID'))
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org/bot')
 bot = Bot(token=TOKEN)
 
-user_last_start_time = {}
 START_COMMAND_COOLDOWN = 3
 MAX_START_COMMAND_COOLDOWN = 30
-user_spam_count = {}
-user_notified = {}
-filename1 = 'glimmer.mp4'
-filename2 = 'radiant.mp4'
+GRID_SESSION_TTL = 3600
+START_LOOKUP_TIMEOUT = 3
+START_VIEW_TTL = 600
+LOOKUP_FAILED = object()
+HISTORY_PAGE_SIZE = 10
+ENTRY_CACHE_SIZE = 1024
+CREDIT_REDEEM_MINIMUM = 1000
+entry_cache = LRUCache(ENTRY_CACHE_SIZE)
+grid_stage_seconds = metrics.Histogram("shards_grid_stage_seconds", "Time spent in each stage of a grid play", ("stage",))
+start_lookup_seconds = metrics.Histogram("shards_start_lookup_seconds", "Latency of each start menu lookup by outcome", ("lookup", "outcome"))
+handle_query_inflight = metrics.Gauge("shards_handle_query_inflight", "Callback query handlers currently running")
 
-GAME_CONFIG = {
-    "grid": {"size": 5, "entry_fee": 0.03, "nft_count": 1, "token_count": 5, "token_prize": 25000}
-}
-
-CURRENT_GAME_ID = None
 TOKEN_ACTIVE = False
-
-TOKEN_PRIZE_OPTIONS = [50000, 25000, 12500, 5000, 5000]
+_initialized = None
+_reservation_sweeper = None
 
 async def load_config():
     try:
@@ -78,247 +89,127 @@ async def load_config():
         return False
 
 async def get_latest_game_id():
-    pool = await aiomysql.create_pool(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, autocommit=True)
     try:
-        async with pool.acquire() as conn:
-            await conn.select_db(DB_NAME)
-            async with conn.cursor() as cursor:
-                await cursor.execute("SELECT MAX(game_id) FROM game_entries")
-                result = await cursor.fetchone()
-                return result[0] if result[0] is not None else 1000
+        async with db.cursor() as cursor:
+            await cursor.execute("SELECT MAX(game_id) FROM game_entries")
+            result = await cursor.fetchone()
+            return result[0] if result[0] is not None else 1000
     except Exception as e:
         logging.error(f"Error fetching latest game_id: {e}")
         return 1000
-    finally:
-        pool.close()
-        await pool.wait_closed()
-
-async def setup_database():
-    pool = await aiomysql.create_pool(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, autocommit=True)
-    async with pool.acquire() as conn:
-        async with conn.cursor() as cursor:
-            await cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
-            await cursor.execute(f"USE {DB_NAME}")
-            await cursor.execute(f"GRANT ALL PRIVILEGES ON {DB_NAME}.* TO '{DB_USER}'@'%'")
-            await cursor.execute("FLUSH PRIVILEGES")
-            await cursor.execute('''
-                CREATE TABLE IF NOT EXISTS players (
-                    user_id BIGINT PRIMARY KEY,
-                    wallet_address TEXT NOT NULL,
-                    earned DOUBLE DEFAULT 0,
-                    referrer_id BIGINT,
-                    credit_balance DOUBLE DEFAULT 0,
-                    FOREIGN KEY (referrer_id) REFERENCES players(user_id)
-                )
-            ''')
-            await cursor.execute('''
-                CREATE TABLE IF NOT EXISTS game_grid (
-                    id BIGINT PRIMARY KEY AUTO_INCREMENT,
-                    wallet_address TEXT NOT NULL,
-                    round DOUBLE DEFAULT 0,
-                    entries JSON
-                )
-            ''')
-            await cursor.execute('''
-                CREATE TABLE IF NOT EXISTS game_entries (
-                    game_id BIGINT PRIMARY KEY,
-                    user_id BIGINT NOT NULL,
-                    user_wallet TEXT NOT NULL,
-                    choice TEXT NOT NULL,
-                    grid JSON NOT NULL,
-                    reward_success BOOLEAN DEFAULT FALSE,
-                    prize_amount DOUBLE DEFAULT 0,
-                    prize_type VARCHAR(10),
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            await cursor.execute('''
-                CREATE TABLE IF NOT EXISTS affiliate_rewards (
-                    referrer_id BIGINT,
-                    referral_count INT DEFAULT 0,
-                    shard_rewards DOUBLE DEFAULT 0,
-                    PRIMARY KEY (referrer_id),
-                    FOREIGN KEY (referrer_id) REFERENCES players(user_id)
-                )
-            ''')
-            await asyncio.shield(generate_wallet_if_needed(cursor, "game_grid"))
-    pool.close()
-    await pool.wait_closed()
 
 async def private_chat_only(update: Update, context: CallbackContext):
     return update.effective_chat.type == 'private'
 
 async def increment_referral_count(referrer_id):
-    global TOKEN_ACTIVE
-    pool = await aiomysql.create_pool(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, autocommit=True)
-    async with pool.acquire() as conn:
-        await conn.select_db(DB_NAME)
-        async with conn.cursor() as cursor:
-            await cursor.execute(
-                '''
-                INSERT INTO affiliate_rewards (referrer_id, referral_count)
-                VALUES (%s, 1)
-                ON DUPLICATE KEY UPDATE referral_count = referral_count + 1
-                ''',
-                (referrer_id,)
-            )
-            await cursor.execute("SELECT referral_count FROM affiliate_rewards WHERE referrer_id = %s", (referrer_id,))
-            result = await cursor.fetchone()
-            referral_count = result[0] if result else 0
-            if referral_count % 10 == 0:
-                shard_reward = 10000
-                if TOKEN_ACTIVE:
-                    await cursor.execute(
-                        '''
-                        UPDATE affiliate_rewards
-                        SET shard_rewards = shard_rewards + %s
-                        WHERE referrer_id = %s
-                        ''',
-                        (shard_reward, referrer_id)
-                    )
-                else:
-                    await update_credit_balance(referrer_id, shard_reward)
-                await bot.send_message(
-                    chat_id=referrer_id,
-                    text=f"🎉 Congrats! You've earned {shard_reward} $SHARD {'tokens' if TOKEN_ACTIVE else 'credits'} for reaching {referral_count} referrals (pre-launch bonus)!"
-                )
-    pool.close()
-    await pool.wait_closed()
-
-async def update_credit_balance(user_id, amount):
-    pool = await aiomysql.create_pool(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, autocommit=True)
-    async with pool.acquire() as conn:
-        await conn.select_db(DB_NAME)
-        async with conn.cursor() as cursor:
-            await cursor.execute(
-                '''
-                UPDATE players
-                SET credit_balance = credit_balance + %s
-                WHERE user_id = %s
-                ''',
-                (amount, user_id)
-            )
-    pool.close()
-    await pool.wait_closed()
+    referral_count, shard_reward = await record_referral(referrer_id, TOKEN_ACTIVE)
+    if shard_reward:
+        await bot.send_message(
+            chat_id=referrer_id,
+            text=f"🎉 Congrats! You've earned {int(shard_reward)} $SHARD {'tokens' if TOKEN_ACTIVE else 'credits'} for reaching {referral_count} referrals (pre-launch bonus)!"
+        )
 
 async def get_referral_info(user_id):
-    pool = await aiomysql.create_pool(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, autocommit=True)
-    async with pool.acquire() as conn:
-        await conn.select_db(DB_NAME)
-        async with conn.cursor() as cursor:
-            await cursor.execute(
-                "SELECT referral_count, shard_rewards FROM affiliate_rewards WHERE referrer_id = %s",
-                (user_id,)
-            )
-            result = await cursor.fetchone()
-            referral_count = result[0] if result else 0
-            shard_rewards = result[1] if result else 0
-            return referral_count, shard_rewards
-    pool.close()
-    await pool.wait_closed()
-
-async def get_credit_balance(user_id):
-    pool = await aiomysql.create_pool(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, autocommit=True)
-    async with pool.acquire() as conn:
-        await conn.select_db(DB_NAME)
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT credit_balance FROM players WHERE user_id = %s", (user_id,))
-            result = await cursor.fetchone()
-            return result[0] if result else 0
-    pool.close()
-    await pool.wait_closed()
-
-async def get_jackpot_balance():
-    game_wallet = await get_game_wallet("game_grid")
-    return await get_balance(game_wallet)
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            "SELECT referral_count, shard_rewards FROM affiliate_rewards WHERE referrer_id = %s",
+            (user_id,)
+        )
+        result = await cursor.fetchone()
+        referral_count = result[0] if result else 0
+        shard_rewards = result[1] if result else 0
+        return referral_count, shard_rewards
 
 async def create_start_task(update: Update, context: CallbackContext):
     if not await private_chat_only(update, context):
         return
     user_id = update.effective_user.id
     current_time = time.time()
-    if user_id in user_last_start_time and (current_time - user_last_start_time[user_id]) < START_COMMAND_COOLDOWN:
-        user_spam_count[user_id] = user_spam_count.get(user_id, 0) + 1
-        cooldown_time = min(START_COMMAND_COOLDOWN + (user_spam_count[user_id] * 3), MAX_START_COMMAND_COOLDOWN)
-        if user_id not in user_notified:
-            user_notified[user_id] = True
+    cooldown_key = f"cooldown_{user_id}"
+    cooldown = await state_store.get(cooldown_key)
+    if cooldown and (current_time - cooldown["last_start"]) < START_COMMAND_COOLDOWN:
+        cooldown["spam_count"] += 1
+        cooldown_time = min(START_COMMAND_COOLDOWN + (cooldown["spam_count"] * 3), MAX_START_COMMAND_COOLDOWN)
+        notify = not cooldown["notified"]
+        cooldown["notified"] = True
+        await state_store.set(cooldown_key, cooldown, MAX_START_COMMAND_COOLDOWN)
+        if notify:
             await update.message.reply_text(f"Please wait {cooldown_time} seconds before trying again.")
         return
-    else:
-        user_spam_count[user_id] = 0
-        user_notified[user_id] = False
-    user_last_start_time[user_id] = current_time
+    await state_store.set(cooldown_key, {"last_start": current_time, "spam_count": 0, "notified": False}, MAX_START_COMMAND_COOLDOWN)
     asyncio.create_task(start(update, context, user_id))
 
-async def start(update: Update, context: Application, user_id: int = None):
-    if not await private_chat_only(update, context):
-        return
-    user_id = user_id or update.effective_user.id
-    await asyncio.sleep(2.5)
-    wallet_address = await asyncio.shield(get_wallet_address(user_id))
-    referrer_id = context.args[0] if context.args else None
-    if wallet_address:
-        balance = await asyncio.shield(get_balance(wallet_address))
-        balance_formatted = f"{math.floor(balance * 1000) / 1000:.3f}"
-        spl_balance = await asyncio.shield(get_solana_token_amount(wallet_address))
-        spl_balance_formatted = round(spl_balance)
-        credit_balance = await get_credit_balance(user_id)
-    else:
+def _discard_result(task):
+    if not task.cancelled():
+        task.exception()
+
+async def lookup(name, coro, default=None):
+    started = time.perf_counter()
+    task = asyncio.ensure_future(coro)
+    try:
+        value = await asyncio.wait_for(asyncio.shield(task), START_LOOKUP_TIMEOUT)
+    except Exception as e:
+        task.add_done_callback(_discard_result)
+        start_lookup_seconds.observe(time.perf_counter() - started, lookup=name, outcome="timeout" if isinstance(e, asyncio.TimeoutError) else "error")
+        logging.error(f"Start menu lookup {name} failed: {e!r}")
+        return default
+    start_lookup_seconds.observe(time.perf_counter() - started, lookup=name, outcome="ok")
+    return value
+
+async def load_start_view(user_id, referrer_id):
+    jackpot_task = asyncio.ensure_future(lookup("jackpot", get_jackpot_balance()))
+    wallet_address = await lookup("wallet", get_wallet_address(user_id), LOOKUP_FAILED)
+    if wallet_address is LOOKUP_FAILED:
+        return {"jackpot": await jackpot_task}
+    if not wallet_address:
         wallet_address = "NEW_WALLET_ADDRESS"
         credit_balance = 0
         await asyncio.shield(save_wallet_address_new(user_id, wallet_address, 0, None, 0, referrer_id, credit_balance))
-        balance_formatted = "0.000"
-        spl_balance_formatted = "0"
         if referrer_id:
             await increment_referral_count(referrer_id)
-    jackpot_balance = await get_jackpot_balance()
-    jackpot_formatted = f"{math.floor(jackpot_balance / 2 * 1000) / 1000:.3f}"
-    welcome_message = (
-        f"💎 *Welcome to SHARDS!* 💎\n\n"
-        f"A 5x5 grid of shards with hidden prizes!\n\n"
-        f"🎮 *How It Works:*\n"
-        f"• Grid Example:\n"
-        f"```\n"
-        f"    A B C D E\n"
-        f"  1 - - - - -\n"
-        f"  2 - - - - -\n"
-        f"  3 - - - - -\n"
-        f"  4 - - - - -\n"
-        f"  5 - - - - -\n"
-        f"```\n"
-        f"• Pay 0.03 SOL to break a shard 💎 (e.g., A1, E5)\n"
-        f"• Prizes: 20% chance of Jackpot appearing, 5 Token wins (5k-50k SHARDS), or Nothing\n"
-        f"• Current *Jackpot*: {jackpot_formatted} SOL\n\n"
-        f"💰 *Your Info:*\n"
-        f"• *Sol Balance:* {balance_formatted} Sol\n"
-        f"• *Token Balance:* {spl_balance_formatted}\n"
-        f"• *Token Credits:* {credit_balance}\n"
-        f"• *Wallet:* `{wallet_address}`\n\n"
-        f"✨ *Ready to break some shards?*"
+        return {"jackpot": await jackpot_task, "wallet": wallet_address, "balance": 0, "spl_balance": 0, "credit_balance": credit_balance}
+    balance, spl_balance, credit_balance, jackpot_balance = await asyncio.gather(
+        lookup("balance", get_balance(wallet_address)),
+        lookup("spl_balance", get_solana_token_amount(wallet_address)),
+        lookup("credits", get_credits(user_id)),
+        jackpot_task
     )
-    keyboard = await build_grid_keyboard(user_id)
-    keyboard.append([InlineKeyboardButton("---", callback_data="noop")])
-    keyboard.append([
-        InlineKeyboardButton("How to Play?", callback_data='info'),
-        InlineKeyboardButton("Wallet", callback_data='wallet')
-    ])
-    keyboard.append([
-        InlineKeyboardButton("Redeem Credits", callback_data='withdraw'),
-        InlineKeyboardButton("Referral", callback_data='refer'),
-    ])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    if update.message:
-        await update.message.reply_text(welcome_message, reply_markup=reply_markup, parse_mode="markdown")
-    elif update.callback_query:
-        await context.bot.send_message(chat_id=user_id, text=welcome_message, reply_markup=reply_markup, parse_mode="markdown")
-    else:
-        await context.bot.send_message(chat_id=user_id, text=welcome_message, reply_markup=reply_markup, parse_mode="markdown")
+    return {"jackpot": jackpot_balance, "wallet": wallet_address, "balance": balance, "spl_balance": spl_balance, "credit_balance": credit_balance}
+
+async def start(update: Update, context: Application, user_id: int = None):
+    if not await private_chat_only(update, context):
+        return
+    user_id = user_id or update.effective_user.id
+    referrer_id = context.args[0] if context.args else None
+    view_key = f"start_view_{user_id}"
+    cached_view = await state_store.get(view_key) or {}
+    if peek_jackpot_balance() is not None:
+        cached_view["jackpot"] = peek_jackpot_balance()
+    welcome_message = format_start_message(cached_view)
+    reply_markup = start_markup()
+    with send_priority(PRIORITY_MENU):
+        if update.message:
+            message = await update.message.reply_text(welcome_message, reply_markup=reply_markup, parse_mode="markdown")
+        elif update.callback_query:
+            message = await context.bot.send_message(chat_id=user_id, text=welcome_message, reply_markup=reply_markup, parse_mode="markdown")
+        else:
+            message = await context.bot.send_message(chat_id=user_id, text=welcome_message, reply_markup=reply_markup, parse_mode="markdown")
+    fresh_view = await load_start_view(user_id, referrer_id)
+    view = {**cached_view, **{key: value for key, value in fresh_view.items() if value is not None}}
+    await state_store.set(view_key, view, START_VIEW_TTL)
+    updated_message = format_start_message(view)
+    if updated_message != welcome_message:
+        try:
+            with send_priority(PRIORITY_MENU):
+                await message.edit_text(updated_message, reply_markup=reply_markup, parse_mode="markdown")
+        except TelegramError as e:
+            logging.error(f"Failed to update start menu: {e}")
 
 async def create_grid(size, nft_count, token_count):
     grid = [['-' for _ in range(size)] for _ in range(size)]
     positions = [(i, j) for i in range(size) for j in range(size)]
     random.shuffle(positions)
-    include_jackpot = random.random() < 0.2
+    include_jackpot = random.random() < JACKPOT_CHANCE
     jackpot_pos = None
     if include_jackpot and nft_count > 0:
         jackpot_pos = positions.pop()
@@ -328,58 +219,64 @@ async def create_grid(size, nft_count, token_count):
         grid[pos[0]][pos[1]] = 'T'
     return grid, jackpot_pos, token_positions
 
-async def build_grid_keyboard(user_id, grid_state=None, active=True, selected_pos=None):
-    config = GAME_CONFIG["grid"]
-    keyboard = []
-    for i in range(config["size"]):
-        row = []
-        for j in range(config["size"]):
-            if grid_state and grid_state[i][j] != '-':
-                emoji = '🎰' if grid_state[i][j] == 'N' else '🪙' if grid_state[i][j] == 'T' else '✖️'
-                label = f"({emoji})" if selected_pos and selected_pos == (i, j) else emoji
-            else:
-                label = "💎" if active else "✖️"
-            callback = f"grid_{user_id},{i},{j}" if active else "noop"
-            row.append(InlineKeyboardButton(label, callback_data=callback))
-        keyboard.append(row)
-    return keyboard
-
-async def format_grid_result(grid, user_choice):
-    cols = ['A', 'B', 'C', 'D', 'E']
-    result = "  A B C D E\n"
-    for i in range(len(grid)):
-        row = f"{i+1} " + " ".join(
-            grid[i][j] if (i, j) == user_choice else 'X' if grid[i][j] == '-' else grid[i][j]
-            for j in range(len(grid[0]))
-        )
-        result += row + "\n"
-    return result
-
 async def store_entry(game_id, user_id, user_wallet, choice, grid, reward_success, prize_amount=0, prize_type=None):
-    pool = await aiomysql.create_pool(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, autocommit=True)
-    async with pool.acquire() as conn:
-        await conn.select_db(DB_NAME)
-        async with conn.cursor() as cursor:
-            await cursor.execute(
-                '''
-                INSERT INTO game_entries (game_id, user_id, user_wallet, choice, grid, reward_success, prize_amount, prize_type)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ''',
-                (game_id, user_id, user_wallet, choice, json.dumps(grid), reward_success, prize_amount, prize_type)
-            )
-    pool.close()
-    await pool.wait_closed()
+    entry_buffer.add(game_id, user_id, user_wallet, choice, grid, reward_success, prize_amount, prize_type)
 
 async def get_entry(game_id):
-    pool = await aiomysql.create_pool(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, autocommit=True)
-    async with pool.acquire() as conn:
-        await conn.select_db(DB_NAME)
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT * FROM game_entries WHERE game_id = %s", (game_id,))
-            result = await cursor.fetchone()
-    pool.close()
-    await pool.wait_closed()
-    return result
+    buffered = entry_buffer.get(game_id)
+    if buffered:
+        return buffered
+    cached = entry_cache.get(game_id)
+    if cached:
+        return cached
+    async with db.cursor() as cursor:
+        await cursor.execute("SELECT * FROM game_entries WHERE game_id = %s", (game_id,))
+        entry = await cursor.fetchone()
+    if entry:
+        entry_cache.set(game_id, entry)
+    return entry
+
+async def get_history(user_id, before=None, limit=HISTORY_PAGE_SIZE):
+    query = "SELECT game_id, choice, prize_amount, prize_type, reward_success, timestamp FROM game_entries WHERE user_id = %s"
+    params = [user_id]
+    if before:
+        query += " AND (timestamp < %s OR (timestamp = %s AND game_id < %s))"
+        params += [before[0], before[0], before[1]]
+    query += " ORDER BY timestamp DESC, game_id DESC LIMIT %s"
+    params.append(limit + 1)
+    async with db.cursor() as cursor:
+        await cursor.execute(query, params)
+        rows = {row[0]: row for row in await cursor.fetchall()}
+    for game_id, entry_user_id, _, choice, _, reward_success, prize_amount, prize_type, timestamp in entry_buffer.rows():
+        if entry_user_id == user_id and (not before or (timestamp, game_id) < before):
+            rows[game_id] = (game_id, choice, prize_amount, prize_type, reward_success, timestamp)
+    page = sorted(rows.values(), key=lambda row: (row[5], row[0]), reverse=True)[:limit + 1]
+    return page[:limit], len(page) > limit
+
+async def send_history(update: Update, context: Application, user_id, before=None):
+    rows, has_more = await get_history(user_id, before)
+    text = format_history_page(rows, first_page=before is None)
+    reply_markup = history_markup(rows[-1][5], rows[-1][0]) if has_more else None
+    if update.callback_query:
+        await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode="markdown")
+    else:
+        await update.message.reply_text(text, reply_markup=reply_markup, parse_mode="markdown")
+
+async def history(update: Update, context: Application):
+    if not await private_chat_only(update, context):
+        return
+    await send_history(update, context, update.effective_user.id)
+
+async def user_stats(update: Update, context: Application):
+    if not await private_chat_only(update, context):
+        return
+    player, totals = await asyncio.gather(get_user_stats(update.effective_user.id), get_global_stats())
+    await update.message.reply_text(format_stats(player, totals), parse_mode="markdown")
+
+async def leaderboard(update: Update, context: Application):
+    if not await private_chat_only(update, context):
+        return
+    await update.message.reply_text(format_leaderboard(await get_leaderboard()), parse_mode="markdown")
 
 async def result(update: Update, context: Application):
     if not await private_chat_only(update, context):
@@ -391,25 +288,17 @@ async def result(update: Update, context: Application):
             await update.message.reply_text(f"No entry found for Game ID {game_id}.")
             return
         game_id, user_id, user_wallet, choice, grid_json, reward_success, prize_amount, prize_type, timestamp = entry
-        grid = json.loads(grid_json)
-        cols = ['A', 'B', 'C', 'D', 'E']
-        grid_display = "   A  B  C  D  E\n"
-        for i in range(len(grid)):
-            row = f"{i+1} " + " ".join(
-                "✖️" if grid[i][j] == '-' else "🪙" if grid[i][j] == 'T' else "🎰" if grid[i][j] == 'N' else grid[i][j]
-                for j in range(len(grid[0]))
-            )
-            grid_display += row + "\n"
+        grid_display = format_grid_display(grid_key(json.loads(grid_json)))
         prize_display = f"{prize_amount:.3f} SOL" if prize_type == 'SOL' else f"{int(prize_amount)} SHARDS" if prize_type == 'SHARD' else "None"
-        result_message = (
-            f"*Game Result - ID {game_id}*\n\n"
-            f"• *User ID*: {user_id}\n"
-            f"• *Wallet*: `{user_wallet}`\n"
-            f"• *Choice*: {choice}\n"
-            f"• *Grid*:\n```\n{grid_display}\n```\n"
-            f"• *Prize*: {prize_display}\n"
-            f"• *Reward Sent*: {'Yes' if reward_success else 'No'}\n"
-            f"• *Timestamp*: {timestamp}"
+        result_message = RESULT_TEMPLATE.format(
+            game_id=game_id,
+            user_id=user_id,
+            user_wallet=user_wallet,
+            choice=choice,
+            grid_display=grid_display,
+            prize_display=prize_display,
+            reward_sent='Yes' if reward_success else 'No',
+            timestamp=timestamp
         )
         await update.message.reply_text(result_message, parse_mode="markdown")
     except (IndexError, ValueError):
@@ -420,174 +309,162 @@ async def button(update: Update, context: Application):
     await query.answer()
     user_id = query.from_user.id
     async def handle_query():
-        global CURRENT_GAME_ID, TOKEN_ACTIVE
+        global TOKEN_ACTIVE
         if query.data == 'info':
-            await query.edit_message_text(
-                f"💎 *SHARDS - How to Play* 💎\n\n"
-                f"Break open shards to win prizes on a 5x5 grid!\n\n"
-                f"• Grid Example:\n"
-                f"```\n"
-                f"    A B C D E\n"
-                f"  1 - - - - -\n"
-                f"  2 - - - - -\n"
-                f"  3 - - - - -\n"
-                f"  4 - - - - -\n"
-                f"  5 - - - - -\n"
-                f"```\n"
-                f"• Pay 0.03 SOL to break a shard 💎 (e.g., A1, E5)\n"
-                f"• Prizes: 20% chance of Jackpot appearing, 5 Token wins (5k-50k SHARDS), or Nothing\n"
-                f"• Jackpot winners get 50% of the pool\n\n"
-                f"*How the Jackpot Works:*\n"
-                f"• 80% of entry fees go to the Jackpot pool (90% if no referral)\n"
-                f"• 10% goes to the team\n"
-                f"• 10% for referrals (if applicable)\n\n"
-                f"*Referrals:*\n"
-                f"• Earn 10% of your referrals’ entry fees\n"
-                f"• For every 10 referrals, get 10,000 $SHARD tokens (pre-launch only)\n\n"
-                f"*Redeem Credits:*\n"
-                f"• Post-launch, redeem $SHARD tokens at a 1:1 rate",
-                parse_mode='Markdown'
-            )
+            await query.edit_message_text(INFO_MESSAGE, parse_mode='Markdown')
             await start(update, context, user_id=user_id)
         elif query.data == 'noop':
             return
         elif query.data.startswith('grid_'):
+            current_priority.set(PRIORITY_RESULT)
             config = GAME_CONFIG["grid"]
             _, coords = query.data.split('_', 1)
-            _, row, col = map(int, coords.split(','))
+            row, col = map(int, coords.split(',')[-2:])
             cols = ['A', 'B', 'C', 'D', 'E']
             choice_label = f"{cols[col]}{row+1}"
-            processing_msg = await context.bot.send_message(
-                chat_id=user_id,
-                text=f"Processing Payment. Please wait..."
-            )
-            user_wallet = await get_wallet_address(user_id)
-            balance = await get_balance(user_wallet)
-            if balance < config["entry_fee"]:
-                await processing_msg.edit_text("Insufficient SOL balance. Need at least 0.031 SOL.")
-                await start(update, context, user_id=user_id)
-                return
-            game_wallet = await get_game_wallet("game_grid")
-            pool = await aiomysql.create_pool(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, autocommit=True)
-            async with pool.acquire() as conn:
-                await conn.select_db(DB_NAME)
-                async with conn.cursor() as cursor:
-                    await cursor.execute("SELECT referrer_id FROM players WHERE user_id = %s", (user_id,))
-                    result = await cursor.fetchone()
-                    referrer_id = result[0] if result else None
-                    if referrer_id:
-                        referrer_wallet = await get_wallet_address(referrer_id)
-                        payment_result = await send_sol_e_r(game_wallet, user_wallet, referrer_wallet, None, config["entry_fee"])
-                        if payment_result["success"]:
-                            await cursor.execute(
-                                "UPDATE players SET earned = earned + %s WHERE user_id = %s",
-                                (config["entry_fee"] * 0.1, referrer_id)
-                            )
-                    else:
-                        payment_result = await send_sol_e(game_wallet, user_wallet, None, config["entry_fee"])
-            if not payment_result.get("success"):
-                await processing_msg.edit_text("Payment failed. Try again.")
-                await start(update, context, user_id=user_id)
-                return
-            await processing_msg.edit_text(f"Breaking shard {choice_label}...")
-            processing_msg2 = await context.bot.send_message(
-                chat_id=user_id,
-                text=f"Checking your prize..."
-            )
-            session_key = f"grid_{user_id}"
-            if session_key not in context.user_data:
-                grid, jackpot_pos, token_positions = await create_grid(config["size"], config["nft_count"], config["token_count"])
-                context.user_data[session_key] = {
-                    'grid': grid,
-                    'jackpot_pos': jackpot_pos,
-                    'token_positions': token_positions
-                }
-            grid_data = context.user_data[session_key]
-            grid = grid_data['grid']
-            jackpot_pos = grid_data['jackpot_pos']
-            token_positions = grid_data['token_positions']
-            user_choice = (row, col)
-            result = grid[row][col]
-            reward_success = False
-            prize_amount = 0
-            prize_type = None
-            if result == 'N':
-                jackpot_balance = await get_jackpot_balance()
-                prize_amount = jackpot_balance * 0.5
-                prize_result = await send_sol(user_wallet, game_wallet, None, prize_amount)
-                if prize_result["success"]:
-                    prize_msg = f"🎉 *You won the Jackpot!* {choice_label}\nPrize: {prize_amount:.3f} SOL\nTX: [View on Solscan](https://solscan.io/tx/{prize_result['result']})"
-                    reward_success = True
-                    prize_type = 'SOL'
-                    group_msg = f"🎉 *Someone won the Jackpot!* {choice_label}\nPrize: {prize_amount:.3f} SOL\nTX: [View on Solscan](https://solscan.io/tx/{prize_result['result']})"
+            timer = StageTimer(grid_stage_seconds)
+            try:
+                processing_msg = await context.bot.send_message(
+                    chat_id=user_id,
+                    text=f"Processing Payment. Please wait..."
+                )
+                timer.lap("notify")
+                user_wallet = await get_wallet_address(user_id)
+                balance = await get_balance(user_wallet)
+                timer.lap("balance_check")
+                if balance < config["entry_fee"]:
+                    await processing_msg.edit_text("Insufficient SOL balance. Need at least 0.031 SOL.")
+                    await start(update, context, user_id=user_id)
+                    return
+                try:
+                    game_id = await game_ids.next_id()
+                except Exception as e:
+                    logging.error(f"Could not allocate a game_id for {user_id}: {e}")
+                    await processing_msg.edit_text("The game is temporarily unavailable. You have not been charged, please try again shortly.")
+                    await start(update, context, user_id=user_id)
+                    return
+                game_wallet = await get_jackpot_wallet()
+                referrer_id, referrer_wallet = await get_referrer(user_id)
+                if referrer_id:
+                    payment_result = await send_sol_e_r(game_wallet, user_wallet, referrer_wallet, None, config["entry_fee"])
+                    if payment_result["success"]:
+                        adjust_jackpot_balance(config["entry_fee"] * JACKPOT_SHARE_REFERRAL)
+                        await credit_referral_earnings(referrer_id, config["entry_fee"] * REFERRAL_SHARE)
                 else:
-                    prize_msg = f"🎉 *You won the Jackpot!* {choice_label} (Prize transfer failed, contact support)"
-                    reward_success = False
-                    group_msg = f"🎉 *Someone won the Jackpot!* {choice_label}\nPrize: {prize_amount:.3f} SOL"
-            elif result == 'T':
-                prize = random.choice(TOKEN_PRIZE_OPTIONS)
-                prize_amount = prize
-                if TOKEN_ACTIVE:
-                    user_shard_balance = await get_solana_token_amount(user_wallet)
-                    if user_shard_balance >= 1:
-                        try:
-                            prize_result = await send_spl(user_wallet, game_wallet, None, prize)
-                            if prize_result["success"]:
-                                prize_msg = f"🎉 *You won {prize} SHARDS!* {choice_label}\nTX: [View on Solscan](https://solscan.io/tx/{prize_result['result']})"
-                                reward_success = True
-                                prize_type = 'SHARD'
-                                group_msg = f"🎉 *Someone won {prize} SHARDS!* {choice_label}\nTX: [View on Solscan](https://solscan.io/tx/{prize_result['result']})"
-                            else:
-                                prize_msg = f"🎉 *You won {prize} SHARDS!* {choice_label} (Transfer failed, contact support)"
+                    payment_result = await send_sol_e(game_wallet, user_wallet, None, config["entry_fee"])
+                    if payment_result["success"]:
+                        adjust_jackpot_balance(config["entry_fee"] * JACKPOT_SHARE)
+                timer.lap("payment")
+                if not payment_result.get("success"):
+                    await processing_msg.edit_text("Payment failed. Try again.")
+                    await start(update, context, user_id=user_id)
+                    return
+                await processing_msg.edit_text(f"Breaking shard {choice_label}...")
+                processing_msg2 = await context.bot.send_message(
+                    chat_id=user_id,
+                    text=f"Checking your prize..."
+                )
+                timer.lap("notify")
+                session_key = f"grid_{user_id}"
+                grid_data = await state_store.get(session_key)
+                if grid_data is None:
+                    grid, jackpot_pos, token_positions = await create_grid(config["size"], config["nft_count"], config["token_count"])
+                    grid_data = {
+                        'grid': grid,
+                        'jackpot_pos': jackpot_pos,
+                        'token_positions': token_positions
+                    }
+                    await state_store.set(session_key, grid_data, GRID_SESSION_TTL)
+                grid = grid_data['grid']
+                jackpot_pos = grid_data['jackpot_pos']
+                token_positions = grid_data['token_positions']
+                user_choice = (row, col)
+                result = grid[row][col]
+                timer.lap("session")
+                reward_success = False
+                prize_amount = 0
+                prize_type = None
+                group_msg = None
+                if result == 'N':
+                    prize_result = {"success": False}
+                    try:
+                        jackpot_balance = await retry_async(get_jackpot_balance, fresh=True, retry_on=(rpc.RPCError,))
+                        prize_amount = jackpot_balance * JACKPOT_PAYOUT
+                        prize_result = await send_sol(user_wallet, game_wallet, None, prize_amount)
+                    except Exception as e:
+                        logging.error(f"Could not read the jackpot balance for game {game_id}: {e}")
+                    if prize_result["success"]:
+                        adjust_jackpot_balance(-prize_amount)
+                        prize_msg = f"🎉 *You won the Jackpot!* {choice_label}\nPrize: {prize_amount:.3f} SOL\nTX: [View on Solscan](https://solscan.io/tx/{prize_result['result']})"
+                        reward_success = True
+                        prize_type = 'SOL'
+                        group_msg = f"🎉 *Someone won the Jackpot!* {choice_label}\nPrize: {prize_amount:.3f} SOL\nTX: [View on Solscan](https://solscan.io/tx/{prize_result['result']})"
+                    else:
+                        invalidate_jackpot_balance()
+                        prize_msg = f"🎉 *You won the Jackpot!* {choice_label} (Prize transfer failed, contact support)"
+                        reward_success = False
+                        group_msg = f"🎉 *Someone won the Jackpot!* {choice_label}" + (f"\nPrize: {prize_amount:.3f} SOL" if prize_amount else "")
+                elif result == 'T':
+                    prize = random.choice(TOKEN_PRIZE_OPTIONS)
+                    prize_amount = prize
+                    if TOKEN_ACTIVE:
+                        user_shard_balance = await get_solana_token_amount(user_wallet)
+                        if user_shard_balance is not None and user_shard_balance >= 1:
+                            try:
+                                prize_result = await queue_spl_payout(user_wallet, game_wallet, prize)
+                                if prize_result["success"]:
+                                    prize_msg = f"🎉 *You won {prize} SHARDS!* {choice_label}\nTX: [View on Solscan](https://solscan.io/tx/{prize_result['result']})"
+                                    reward_success = True
+                                    prize_type = 'SHARD'
+                                    group_msg = f"🎉 *Someone won {prize} SHARDS!* {choice_label}\nTX: [View on Solscan](https://solscan.io/tx/{prize_result['result']})"
+                                else:
+                                    prize_msg = f"🎉 *You won {prize} SHARDS!* {choice_label} (Transfer failed, contact support)"
+                                    reward_success = False
+                                    group_msg = f"🎉 *Someone won {prize} SHARDS!* {choice_label}\n"
+                            except Exception as e:
+                                logging.error(f"Failed to send SHARDS: {e}")
+                                prize_msg = f"🎉 *You won {prize} SHARDS!* {choice_label} (Transfer failed due to token account issue, contact support)"
                                 reward_success = False
                                 group_msg = f"🎉 *Someone won {prize} SHARDS!* {choice_label}\n"
-                        except Exception as e:
-                            logging.error(f"Failed to send SHARDS: {e}")
-                            prize_msg = f"🎉 *You won {prize} SHARDS!* {choice_label} (Transfer failed due to token account issue, contact support)"
-                            reward_success = False
+                        else:
+                            prize_msg = f"🎉 *You won {prize} SHARDS!* {choice_label}\nYou need at least 1 SHARD token in your wallet to receive tokens. Credited {prize} SHARDS to your account."
+                            await add_credits(user_id, prize, reference=str(game_id))
+                            reward_success = True
+                            prize_type = 'SHARD'
                             group_msg = f"🎉 *Someone won {prize} SHARDS!* {choice_label}\n"
                     else:
-                        prize_msg = f"🎉 *You won {prize} SHARDS!* {choice_label}\nYou need at least 1 SHARD token in your wallet to receive tokens. Credited {prize} SHARDS to your account."
-                        await update_credit_balance(user_id, prize)
+                        prize_msg = f"🎉 *You won {prize} SHARDS credits!* {choice_label}"
+                        await add_credits(user_id, prize, reference=str(game_id))
                         reward_success = True
                         prize_type = 'SHARD'
                         group_msg = f"🎉 *Someone won {prize} SHARDS!* {choice_label}\n"
                 else:
-                    prize_msg = f"🎉 *You won {prize} SHARDS credits!* {choice_label}"
-                    await update_credit_balance(user_id, prize)
-                    reward_success = True
-                    prize_type = 'SHARD'
-                    group_msg = f"🎉 *Someone won {prize} SHARDS!* {choice_label}\n"
-            else:
-                prize_msg = f"😔 *No prize this time.* {choice_label}"
-                grid[row][col] = 'X'
-                reward_success = False
-            await processing_msg2.edit_text(f"Opening shard {choice_label}...")
-            await asyncio.sleep(2)
-            game_id = CURRENT_GAME_ID
-            CURRENT_GAME_ID += 1
-            await store_entry(game_id, user_id, user_wallet, choice_label, grid, reward_success, prize_amount, prize_type)
-            keyboard = await build_grid_keyboard(user_id, grid_state=grid, active=False, selected_pos=user_choice)
-            await query.edit_message_text(
-                f"{prize_msg}\n\nGame ID: {game_id}",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
-            if group_msg:
-                video_file = filename2 if "Jackpot" in group_msg else filename1
-                try:
-                    await bot.send_video(
-                        chat_id=CHANNELID,
-                        video=open(video_file, 'rb'),
-                        caption=group_msg,
-                        parse_mode="Markdown"
-                    )
-                except Exception as e:
-                    logging.error(f"Failed to send group video: {e}")
-            await context.bot.delete_message(chat_id=user_id, message_id=processing_msg.message_id)
-            await context.bot.delete_message(chat_id=user_id, message_id=processing_msg2.message_id)
-            context.user_data.pop(session_key, None)
-            await start(update, context, user_id=user_id)
+                    prize_msg = f"😔 *No prize this time.* {choice_label}"
+                    grid[row][col] = 'X'
+                    reward_success = False
+                timer.lap("prize")
+                await processing_msg2.edit_text(f"Opening shard {choice_label}...")
+                await asyncio.sleep(2)
+                timer.lap("reveal")
+                await store_entry(game_id, user_id, user_wallet, choice_label, grid, reward_success, prize_amount, prize_type)
+                timer.lap("store_entry")
+                await query.edit_message_text(
+                    f"{prize_msg}\n\nGame ID: {game_id}",
+                    reply_markup=result_markup(grid_key(grid), user_choice),
+                    parse_mode='Markdown'
+                )
+                timer.lap("result")
+                if group_msg:
+                    announce(group_msg, jackpot=result == 'N')
+                await context.bot.delete_message(chat_id=user_id, message_id=processing_msg.message_id)
+                await context.bot.delete_message(chat_id=user_id, message_id=processing_msg2.message_id)
+                await state_store.delete(session_key)
+                await start(update, context, user_id=user_id)
+                timer.lap("render")
+            finally:
+                timer.finish()
+        elif query.data.startswith('history_'):
+            await send_history(update, context, user_id, parse_history_cursor(query.data))
         elif query.data == 'refer':
             referral_count, shard_rewards = await get_referral_info(user_id)
             referral_link = f"https://t.me/ShardsGameBot?start={user_id}"
@@ -642,7 +519,9 @@ async def button(update: Update, context: Application):
         elif query.data == 'yes_withdraw':
             await query.edit_message_text("Checking... Please wait!")
             await initiate_withdraw(update, context, query, user_id)
-    asyncio.create_task(handle_query())
+    handle_query_inflight.inc()
+    task = asyncio.create_task(handle_query())
+    task.add_done_callback(lambda _: handle_query_inflight.dec())
 
 async def import_wallet(update: Update, context: Application, user_id: int, handler: MessageHandler):
     if update.message.chat.type != "private" or update.message.from_user.id != user_id:
@@ -662,11 +541,10 @@ async def import_wallet(update: Update, context: Application, user_id: int, hand
     await start(update, context)
 
 async def initiate_withdraw(update, context, query, user_id):
-    withdraw_amount = await get_credit_balance(user_id)
-    withdraw_float = float(withdraw_amount)
-    if withdraw_float <= 999:
+    current_priority.set(PRIORITY_RESULT)
+    if await get_credits(user_id) < CREDIT_REDEEM_MINIMUM:
         message = (
-            f"You do not have enough credits to make a withdrawal. Minimum required: 1000 credits."
+            f"You do not have enough credits to make a withdrawal. Minimum required: {CREDIT_REDEEM_MINIMUM} credits."
         )
         await context.bot.send_message(chat_id=user_id, text=message)
         await start(update, context, user_id=user_id)
@@ -681,6 +559,10 @@ async def initiate_withdraw(update, context, query, user_id):
         return
     user_wallet = await get_wallet_address_by_user_id(user_id)
     user_shard_balance = await get_solana_token_amount(user_wallet)
+    if user_shard_balance is None:
+        await context.bot.send_message(chat_id=user_id, text="Could not check your SHARD balance right now. Please try again shortly.")
+        await start(update, context, user_id=user_id)
+        return
     if user_shard_balance < 1:
         message = (
             f"You need at least 1 SHARD token in your wallet to redeem credits to $SHARDS. Your current balance: {user_shard_balance} SHARDS."
@@ -688,42 +570,110 @@ async def initiate_withdraw(update, context, query, user_id):
         await context.bot.send_message(chat_id=user_id, text=message)
         await start(update, context, user_id=user_id)
         return
+    try:
+        reservation_id, withdraw_amount = await reserve_credits(user_id, CREDIT_REDEEM_MINIMUM)
+    except InsufficientCreditsError:
+        await context.bot.send_message(chat_id=user_id, text=f"You do not have enough credits to make a withdrawal. Minimum required: {CREDIT_REDEEM_MINIMUM} credits.")
+        await start(update, context, user_id=user_id)
+        return
     message = (
         f"Withdrawal in progress...\n\n"
-        f"Redeeming {withdraw_float} Credits to $SHARDS\n\n"
+        f"Redeeming {withdraw_amount} Credits to $SHARDS\n\n"
         f"Please wait :)"
     )
     progress_message = await context.bot.send_message(chat_id=user_id, text=message)
-    table = "game_grid"
-    wallet = await get_game_wallet(table)
-    transfer_spl = await send_spl(user_wallet, wallet, None, withdraw_amount)
+    wallet = await get_jackpot_wallet()
+    transfer_spl = await queue_spl_payout(user_wallet, wallet, withdraw_amount)
     if transfer_spl['success']:
-        await decrement_user_credit_balance(user_id, withdraw_amount)
+        await settle_credits(user_id, reservation_id, withdraw_amount)
         message = (
             f"Your transaction is successful!\n\n"
             f"Loading start menu"
         )
         await context.bot.send_message(chat_id=user_id, text=message)
     else:
+        await release_credits(user_id, reservation_id, withdraw_amount)
         await context.bot.send_message(chat_id=user_id, text="Withdrawal failed. Please contact support.")
     await start(update, context, user_id=user_id)
 
-def main():
-    application = Application.builder().token(TOKEN).build()
-    application.add_handler(CommandHandler("start", create_start_task))
-    application.add_handler(CommandHandler("result", result))
-    application.add_handler(CallbackQueryHandler(button))
-    threading.Thread(target=async_init, daemon=True).start()
-    time.sleep(1)
-    application.run_polling()
-
-def async_init():
-    async def initialize():
-        global CURRENT_GAME_ID, TOKEN_ACTIVE
-        await setup_database()
-        CURRENT_GAME_ID = await get_latest_game_id() + 1
+async def initialize(application: Application):
+    global TOKEN_ACTIVE, _reservation_sweeper
+    try:
+        await migrations.migrate()
+        await migrations.ensure_game_wallet()
+        entry_buffer.spill_file = worker_spill_file(application.bot_data.get("worker_index", 0))
+        await entry_buffer.load_spill()
+        await game_ids.seed(max([await get_latest_game_id()] + [row[0] for row in entry_buffer.rows()]) + 1)
         TOKEN_ACTIVE = await load_config()
-    asyncio.run(initialize())
+        await announcement_queue.start(application.bot, CHANNELID)
+        _reservation_sweeper = asyncio.create_task(sweep_reservations())
+        if metrics.METRICS_PORT > 0:
+            await metrics.start_server(port=metrics.METRICS_PORT + application.bot_data.get("worker_index", 0))
+    except Exception as e:
+        logging.error(f"Startup failed, stopping: {e}")
+        application.stop_running()
+        raise
+
+async def post_init(application: Application):
+    global bot, _initialized
+    bot = application.bot
+    if LOOP_WATCHDOG:
+        loop_watchdog.start()
+    _initialized = asyncio.create_task(initialize(application))
+
+async def until_ready():
+    await asyncio.shield(_initialized)
+
+def gated(handler):
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: CallbackContext):
+        await until_ready()
+        return await handler(update, context)
+    return wrapper
+
+async def post_stop(application: Application):
+    if _initialized is not None and not _initialized.done():
+        _initialized.cancel()
+        await asyncio.gather(_initialized, return_exceptions=True)
+    if _reservation_sweeper is not None:
+        _reservation_sweeper.cancel()
+        await asyncio.gather(_reservation_sweeper, return_exceptions=True)
+    if LOOP_WATCHDOG:
+        await loop_watchdog.stop()
+    await payout_queue.drain()
+    await announcement_queue.close()
+    await entry_buffer.close()
+
+async def post_shutdown(application: Application):
+    await db.close_pool()
+    await rpc.close_session()
+    await metrics.stop_server()
+
+def build_application(rate_shares=1):
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .base_url(TELEGRAM_API_URL)
+        .rate_limiter(PriorityRateLimiter(shares=rate_shares))
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    application.add_handler(CommandHandler("start", gated(create_start_task)))
+    application.add_handler(CommandHandler("result", gated(result)))
+    application.add_handler(CommandHandler("history", gated(history)))
+    application.add_handler(CommandHandler("stats", gated(user_stats)))
+    application.add_handler(CommandHandler("leaderboard", gated(leaderboard)))
+    application.add_handler(CallbackQueryHandler(gated(button)))
+    return application
+
+def main():
+    if BOT_MODE == 'webhook':
+        from webhook import run_webhook
+        run_webhook()
+        return
+    build_application().run_polling()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
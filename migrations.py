@@ -0,0 +1,228 @@
+import os
+import asyncio
+import logging
+import aiomysql
+import db
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from stats import backfill_stats
+from credits import backfill_credits
+from referrals import install_procedures
+
+load_dotenv('.env')
+
+MIGRATION_LOCK = 'shards_schema_migrations'
+MIGRATION_LOCK_TIMEOUT = int(os.getenv('MIGRATION_LOCK_TIMEOUT', 60))
+ER_BAD_DB_ERROR = 1049
+
+SCHEMA_VERSION = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        name VARCHAR(128) NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+PLAYERS = '''
+    CREATE TABLE IF NOT EXISTS players (
+        user_id BIGINT PRIMARY KEY,
+        wallet_address TEXT NOT NULL,
+        earned DOUBLE DEFAULT 0,
+        referrer_id BIGINT,
+        credit_balance DOUBLE DEFAULT 0,
+        FOREIGN KEY (referrer_id) REFERENCES players(user_id)
+    )
+'''
+
+GAME_GRID = '''
+    CREATE TABLE IF NOT EXISTS game_grid (
+        id BIGINT PRIMARY KEY AUTO_INCREMENT,
+        wallet_address TEXT NOT NULL,
+        round DOUBLE DEFAULT 0,
+        entries JSON
+    )
+'''
+
+GAME_ENTRIES = '''
+    CREATE TABLE IF NOT EXISTS game_entries (
+        game_id BIGINT PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        user_wallet TEXT NOT NULL,
+        choice TEXT NOT NULL,
+        grid JSON NOT NULL,
+        reward_success BOOLEAN DEFAULT FALSE,
+        prize_amount DOUBLE DEFAULT 0,
+        prize_type VARCHAR(10),
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_user_timestamp (user_id, timestamp)
+    )
+'''
+
+AFFILIATE_REWARDS = '''
+    CREATE TABLE IF NOT EXISTS affiliate_rewards (
+        referrer_id BIGINT,
+        referral_count INT DEFAULT 0,
+        shard_rewards DOUBLE DEFAULT 0,
+        PRIMARY KEY (referrer_id),
+        FOREIGN KEY (referrer_id) REFERENCES players(user_id)
+    )
+'''
+
+SESSION_STATE = '''
+    CREATE TABLE IF NOT EXISTS session_state (
+        state_key VARCHAR(128) PRIMARY KEY,
+        value JSON NOT NULL,
+        expires_at DOUBLE,
+        INDEX (expires_at)
+    )
+'''
+
+ID_BLOCKS = '''
+    CREATE TABLE IF NOT EXISTS id_blocks (
+        name VARCHAR(32) PRIMARY KEY,
+        next_id BIGINT NOT NULL
+    )
+'''
+
+TOKEN_ACCOUNTS = '''
+    CREATE TABLE IF NOT EXISTS token_accounts (
+        owner VARCHAR(44) PRIMARY KEY,
+        token_account VARCHAR(44) NOT NULL
+    )
+'''
+
+PLAYER_STATS = '''
+    CREATE TABLE IF NOT EXISTS player_stats (
+        user_id BIGINT PRIMARY KEY,
+        plays INT NOT NULL DEFAULT 0,
+        sol_won DOUBLE NOT NULL DEFAULT 0,
+        shard_won DOUBLE NOT NULL DEFAULT 0,
+        jackpot_hits INT NOT NULL DEFAULT 0,
+        last_played DATETIME,
+        INDEX idx_sol_won (sol_won)
+    )
+'''
+
+GLOBAL_STATS = '''
+    CREATE TABLE IF NOT EXISTS global_stats (
+        id TINYINT PRIMARY KEY,
+        plays BIGINT NOT NULL DEFAULT 0,
+        sol_won DOUBLE NOT NULL DEFAULT 0,
+        shard_won DOUBLE NOT NULL DEFAULT 0,
+        jackpot_hits BIGINT NOT NULL DEFAULT 0
+    )
+'''
+
+CREDIT_LEDGER = '''
+    CREATE TABLE IF NOT EXISTS credit_ledger (
+        id BIGINT PRIMARY KEY AUTO_INCREMENT,
+        user_id BIGINT NOT NULL,
+        kind VARCHAR(16) NOT NULL,
+        amount BIGINT NOT NULL,
+        reserved_delta BIGINT NOT NULL DEFAULT 0,
+        reference VARCHAR(128),
+        closes BIGINT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_user_id (user_id, id),
+        UNIQUE INDEX idx_closes (closes),
+        INDEX idx_kind_created (kind, created_at)
+    )
+'''
+
+CREDIT_BALANCES = '''
+    CREATE TABLE IF NOT EXISTS credit_balances (
+        user_id BIGINT PRIMARY KEY,
+        balance BIGINT NOT NULL DEFAULT 0,
+        reserved BIGINT NOT NULL DEFAULT 0,
+        version BIGINT NOT NULL DEFAULT 0
+    )
+'''
+
+def sql(*statements):
+    async def apply(cursor):
+        for statement in statements:
+            await cursor.execute(statement)
+    return apply
+
+async def add_user_timestamp_index(cursor):
+    await cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics WHERE table_schema = DATABASE() AND table_name = 'game_entries' AND index_name = 'idx_user_timestamp'"
+    )
+    if (await cursor.fetchone())[0] == 0:
+        await cursor.execute("ALTER TABLE game_entries ADD INDEX idx_user_timestamp (user_id, timestamp)")
+
+async def create_stats(cursor):
+    await sql(PLAYER_STATS, GLOBAL_STATS)(cursor)
+    await backfill_stats(cursor)
+
+async def create_credit_ledger(cursor):
+    await sql(CREDIT_LEDGER, CREDIT_BALANCES)(cursor)
+    await backfill_credits(cursor)
+
+MIGRATIONS = [
+    (1, "base tables", sql(PLAYERS, GAME_GRID, GAME_ENTRIES, AFFILIATE_REWARDS)),
+    (2, "game_entries user/timestamp index", add_user_timestamp_index),
+    (3, "session state", sql(SESSION_STATE)),
+    (4, "id blocks", sql(ID_BLOCKS)),
+    (5, "token accounts", sql(TOKEN_ACCOUNTS)),
+    (6, "player and global stats", create_stats),
+    (7, "credit ledger", create_credit_ledger),
+    (8, "record_referral procedure", install_procedures),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+async def create_database():
+    conn = await aiomysql.connect(host=db.DB_HOST, user=db.DB_USER, password=db.DB_PASSWORD, autocommit=True)
+    try:
+        async with conn.cursor() as cursor:
+            await cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db.DB_NAME}")
+            await cursor.execute(f"GRANT ALL PRIVILEGES ON {db.DB_NAME}.* TO '{db.DB_USER}'@'%'")
+            await cursor.execute("FLUSH PRIVILEGES")
+    finally:
+        conn.close()
+
+async def open_database():
+    try:
+        await db.init_pool()
+    except aiomysql.OperationalError as e:
+        if e.args[0] != ER_BAD_DB_ERROR:
+            raise
+        await create_database()
+        await db.init_pool()
+
+async def schema_version(cursor):
+    await cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return (await cursor.fetchone())[0]
+
+@asynccontextmanager
+async def migration_lock(cursor):
+    await cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+    if (await cursor.fetchone())[0] != 1:
+        raise RuntimeError(f"Timed out waiting for {MIGRATION_LOCK}")
+    try:
+        yield
+    finally:
+        await cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+        await cursor.fetchone()
+
+async def migrate():
+    await open_database()
+    async with db.cursor() as cursor:
+        await cursor.execute(SCHEMA_VERSION)
+        if await schema_version(cursor) >= LATEST_VERSION:
+            return
+        async with migration_lock(cursor):
+            await cursor.execute("SELECT version FROM schema_version")
+            applied = {row[0] for row in await cursor.fetchall()}
+            for version, name, apply in MIGRATIONS:
+                if version in applied:
+                    continue
+                logging.info(f"Applying schema migration {version}: {name}")
+                await apply(cursor)
+                await cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)", (version, name))
+
+async def ensure_game_wallet():
+    from dbcalls import generate_wallet_if_needed
+    async with db.cursor() as cursor:
+        async with migration_lock(cursor):
+            await asyncio.shield(generate_wallet_if_needed(cursor, "game_grid"))
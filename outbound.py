@@ -0,0 +1,154 @@
+import os
+import time
+import asyncio
+import itertools
+import contextvars
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+load_dotenv('.env')
+
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', 30))
+OUTBOUND_CHAT_RATE = float(os.getenv('OUTBOUND_CHAT_RATE', 1))
+OUTBOUND_GROUP_RATE = float(os.getenv('OUTBOUND_GROUP_RATE', 20 / 60))
+OUTBOUND_CHAT_BURST = float(os.getenv('OUTBOUND_CHAT_BURST', 5))
+OUTBOUND_GROUP_BURST = float(os.getenv('OUTBOUND_GROUP_BURST', 3))
+OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', 3))
+
+PRIORITY_RESULT = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_MENU = 2
+PRIORITY_ANNOUNCEMENT = 3
+
+UNLIMITED_ENDPOINTS = {"getUpdates", "getMe", "answerCallbackQuery", "setWebhook", "deleteWebhook", "getFile"}
+
+current_priority = contextvars.ContextVar("current_priority", default=PRIORITY_DEFAULT)
+
+@contextmanager
+def send_priority(priority):
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        if self.paused_until > now:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class PriorityRateLimiter(BaseRateLimiter):
+    def __init__(self, global_rate=OUTBOUND_GLOBAL_RATE, chat_rate=OUTBOUND_CHAT_RATE, group_rate=OUTBOUND_GROUP_RATE, max_retries=OUTBOUND_MAX_RETRIES, shares=1):
+        self.global_bucket = TokenBucket(global_rate / shares)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate / shares
+        self.group_burst = max(1.0, OUTBOUND_GROUP_BURST / shares)
+        self.max_retries = max_retries
+        self._chat_buckets = {}
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+
+    async def initialize(self):
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+
+    def _bucket_for(self, chat_id):
+        if chat_id is None:
+            return None
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if str(chat_id).startswith('-'):
+                bucket = TokenBucket(self.group_rate, capacity=self.group_burst)
+            else:
+                bucket = TokenBucket(self.chat_rate, capacity=OUTBOUND_CHAT_BURST)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _dispatch(self):
+        while True:
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            global_delay = self.global_bucket.delay(now)
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+                continue
+            released = None
+            next_delay = None
+            for entry in sorted(self._waiters):
+                _, _, bucket, future = entry
+                if future.done():
+                    released = entry
+                    break
+                chat_delay = bucket.delay(now) if bucket is not None else 0.0
+                if chat_delay == 0:
+                    self.global_bucket.take()
+                    if bucket is not None:
+                        bucket.take()
+                    future.set_result(None)
+                    released = entry
+                    break
+                next_delay = chat_delay if next_delay is None else min(next_delay, chat_delay)
+            if released is not None:
+                self._waiters.remove(released)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), next_delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _acquire(self, priority, bucket):
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((priority, next(self._sequence), bucket, future))
+        self._wakeup.set()
+        await future
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint in UNLIMITED_ENDPOINTS or self._dispatcher is None:
+            return await callback(*args, **kwargs)
+        priority = rate_limit_args if rate_limit_args is not None else current_priority.get()
+        bucket = self._bucket_for(data.get("chat_id"))
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, bucket)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                self.global_bucket.pause(retry_after)
+                if bucket is not None:
+                    bucket.pause(retry_after)
+                if attempt == self.max_retries:
+                    raise
@@ -0,0 +1,60 @@
+import os
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+PAYOUT_BATCH_SIZE = int(os.getenv('PAYOUT_BATCH_SIZE', 16))
+PAYOUT_FLUSH_INTERVAL = float(os.getenv('PAYOUT_FLUSH_INTERVAL', 2))
+
+class PayoutQueue:
+    def __init__(self, batch_size=PAYOUT_BATCH_SIZE, flush_interval=PAYOUT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._timers = {}
+        self._tasks = set()
+
+    async def submit(self, wallet, source_wallet, amount):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(source_wallet, [])
+        batch.append((wallet, amount, future))
+        if len(batch) >= self.batch_size:
+            self.flush(source_wallet)
+        elif source_wallet not in self._timers:
+            self._timers[source_wallet] = loop.call_later(self.flush_interval, self.flush, source_wallet)
+        return await asyncio.shield(future)
+
+    def flush(self, source_wallet):
+        timer = self._timers.pop(source_wallet, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(source_wallet, None)
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._send(source_wallet, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, source_wallet, batch):
+        try:
+            from sendSPL import send_spl_batch
+            results = await send_spl_batch(source_wallet, [(wallet, amount) for wallet, amount, _ in batch])
+        except Exception as e:
+            logging.error(f"SHARD payout batch failed: {e}")
+            results = [{"success": False, "error": str(e)} for _ in batch]
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def drain(self):
+        for source_wallet in list(self._pending):
+            self.flush(source_wallet)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+payout_queue = PayoutQueue()
+
+async def queue_spl_payout(wallet, source_wallet, amount):
+    return await payout_queue.submit(wallet, source_wallet, amount)
@@ -0,0 +1,60 @@
+import db
+from game_rules import REFERRAL_MILESTONE, REFERRAL_MILESTONE_REWARD
+
+RECORD_REFERRAL_PROCEDURE = '''
+    CREATE PROCEDURE record_referral(IN p_referrer_id BIGINT, IN p_milestone INT, IN p_reward BIGINT, IN p_token_active BOOLEAN)
+    BEGIN
+        DECLARE v_count INT;
+        DECLARE v_reward BIGINT DEFAULT 0;
+        DECLARE EXIT HANDLER FOR SQLEXCEPTION BEGIN ROLLBACK; RESIGNAL; END;
+        START TRANSACTION;
+        INSERT INTO affiliate_rewards (referrer_id, referral_count)
+        VALUES (p_referrer_id, LAST_INSERT_ID(1))
+        ON DUPLICATE KEY UPDATE referral_count = LAST_INSERT_ID(referral_count + 1);
+        SET v_count = LAST_INSERT_ID();
+        IF v_count % p_milestone = 0 THEN
+            SET v_reward = p_reward;
+            IF p_token_active THEN
+                UPDATE affiliate_rewards SET shard_rewards = shard_rewards + v_reward WHERE referrer_id = p_referrer_id;
+            ELSE
+                INSERT INTO credit_balances (user_id, balance, version)
+                VALUES (p_referrer_id, v_reward, 1)
+                ON DUPLICATE KEY UPDATE balance = balance + v_reward, version = version + 1;
+                INSERT INTO credit_ledger (user_id, kind, amount, reference)
+                VALUES (p_referrer_id, 'referral', v_reward, CONCAT('referrals:', v_count));
+            END IF;
+        END IF;
+        COMMIT;
+        SELECT v_count, v_reward;
+    END
+'''
+
+async def install_procedures(cursor):
+    await cursor.execute("DROP PROCEDURE IF EXISTS record_referral")
+    await cursor.execute(RECORD_REFERRAL_PROCEDURE)
+
+async def record_referral(referrer_id, token_active):
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            "CALL record_referral(%s, %s, %s, %s)",
+            (referrer_id, REFERRAL_MILESTONE, REFERRAL_MILESTONE_REWARD, token_active)
+        )
+        return await cursor.fetchone()
+
+async def get_referrer(user_id):
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            '''
+            SELECT referrer.user_id, referrer.wallet_address
+            FROM players AS player
+            JOIN players AS referrer ON referrer.user_id = player.referrer_id
+            WHERE player.user_id = %s
+            ''',
+            (user_id,)
+        )
+        result = await cursor.fetchone()
+        return result if result else (None, None)
+
+async def credit_referral_earnings(referrer_id, amount):
+    async with db.cursor() as cursor:
+        await cursor.execute("UPDATE players SET earned = earned + %s WHERE user_id = %s", (amount, referrer_id))
@@ -0,0 +1,192 @@
+import math
+import datetime
+from functools import lru_cache
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+from game_rules import GAME_CONFIG
+
+PLACEHOLDER = "…"
+RENDER_CACHE_SIZE = 4096
+
+GRID_EXAMPLE = (
+    "```\n"
+    "    A B C D E\n"
+    "  1 - - - - -\n"
+    "  2 - - - - -\n"
+    "  3 - - - - -\n"
+    "  4 - - - - -\n"
+    "  5 - - - - -\n"
+    "```\n"
+)
+
+START_TEMPLATE = (
+    "💎 *Welcome to SHARDS!* 💎\n\n"
+    "A 5x5 grid of shards with hidden prizes!\n\n"
+    "🎮 *How It Works:*\n"
+    "• Grid Example:\n"
+    + GRID_EXAMPLE +
+    "• Pay 0.03 SOL to break a shard 💎 (e.g., A1, E5)\n"
+    "• Prizes: 20% chance of Jackpot appearing, 5 Token wins (5k-50k SHARDS), or Nothing\n"
+    "• Current *Jackpot*: {jackpot} SOL\n\n"
+    "💰 *Your Info:*\n"
+    "• *Sol Balance:* {balance} Sol\n"
+    "• *Token Balance:* {spl_balance}\n"
+    "• *Token Credits:* {credit_balance}\n"
+    "• *Wallet:* `{wallet}`\n\n"
+    "✨ *Ready to break some shards?*"
+)
+
+INFO_MESSAGE = (
+    "💎 *SHARDS - How to Play* 💎\n\n"
+    "Break open shards to win prizes on a 5x5 grid!\n\n"
+    "• Grid Example:\n"
+    + GRID_EXAMPLE +
+    "• Pay 0.03 SOL to break a shard 💎 (e.g., A1, E5)\n"
+    "• Prizes: 20% chance of Jackpot appearing, 5 Token wins (5k-50k SHARDS), or Nothing\n"
+    "• Jackpot winners get 50% of the pool\n\n"
+    "*How the Jackpot Works:*\n"
+    "• 80% of entry fees go to the Jackpot pool (90% if no referral)\n"
+    "• 10% goes to the team\n"
+    "• 10% for referrals (if applicable)\n\n"
+    "*Referrals:*\n"
+    "• Earn 10% of your referrals’ entry fees\n"
+    "• For every 10 referrals, get 10,000 $SHARD tokens (pre-launch only)\n\n"
+    "*Redeem Credits:*\n"
+    "• Post-launch, redeem $SHARD tokens at a 1:1 rate"
+)
+
+RESULT_TEMPLATE = (
+    "*Game Result - ID {game_id}*\n\n"
+    "• *User ID*: {user_id}\n"
+    "• *Wallet*: `{user_wallet}`\n"
+    "• *Choice*: {choice}\n"
+    "• *Grid*:\n```\n{grid_display}\n```\n"
+    "• *Prize*: {prize_display}\n"
+    "• *Reward Sent*: {reward_sent}\n"
+    "• *Timestamp*: {timestamp}"
+)
+
+def grid_key(grid):
+    return tuple(tuple(row) for row in grid)
+
+def format_start_message(view):
+    jackpot_balance = view.get("jackpot")
+    balance = view.get("balance")
+    spl_balance = view.get("spl_balance")
+    credit_balance = view.get("credit_balance")
+    return START_TEMPLATE.format(
+        jackpot=f"{math.floor(jackpot_balance / 2 * 1000) / 1000:.3f}" if jackpot_balance is not None else PLACEHOLDER,
+        balance=f"{math.floor(balance * 1000) / 1000:.3f}" if balance is not None else PLACEHOLDER,
+        spl_balance=round(spl_balance) if spl_balance is not None else PLACEHOLDER,
+        credit_balance=credit_balance if credit_balance is not None else PLACEHOLDER,
+        wallet=view.get("wallet") or PLACEHOLDER
+    )
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def grid_keyboard(grid_state=None, active=True, selected_pos=None):
+    config = GAME_CONFIG["grid"]
+    keyboard = []
+    for i in range(config["size"]):
+        row = []
+        for j in range(config["size"]):
+            if grid_state and grid_state[i][j] != '-':
+                emoji = '🎰' if grid_state[i][j] == 'N' else '🪙' if grid_state[i][j] == 'T' else '✖️'
+                label = f"({emoji})" if selected_pos and selected_pos == (i, j) else emoji
+            else:
+                label = "💎" if active else "✖️"
+            callback = f"grid_{i},{j}" if active else "noop"
+            row.append(InlineKeyboardButton(label, callback_data=callback))
+        keyboard.append(tuple(row))
+    return tuple(keyboard)
+
+@lru_cache(maxsize=1)
+def start_markup():
+    keyboard = list(grid_keyboard())
+    keyboard.append([InlineKeyboardButton("---", callback_data="noop")])
+    keyboard.append([
+        InlineKeyboardButton("How to Play?", callback_data='info'),
+        InlineKeyboardButton("Wallet", callback_data='wallet')
+    ])
+    keyboard.append([
+        InlineKeyboardButton("Redeem Credits", callback_data='withdraw'),
+        InlineKeyboardButton("Referral", callback_data='refer'),
+    ])
+    return InlineKeyboardMarkup(keyboard)
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def result_markup(grid_state, selected_pos):
+    return InlineKeyboardMarkup(grid_keyboard(grid_state, active=False, selected_pos=selected_pos))
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def format_grid_result(grid_state, user_choice):
+    result = "  A B C D E\n"
+    for i in range(len(grid_state)):
+        row = f"{i+1} " + " ".join(
+            grid_state[i][j] if (i, j) == user_choice else 'X' if grid_state[i][j] == '-' else grid_state[i][j]
+            for j in range(len(grid_state[0]))
+        )
+        result += row + "\n"
+    return result
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def format_grid_display(grid_state):
+    grid_display = "   A  B  C  D  E\n"
+    for i in range(len(grid_state)):
+        row = f"{i+1} " + " ".join(
+            "✖️" if grid_state[i][j] == '-' else "🪙" if grid_state[i][j] == 'T' else "🎰" if grid_state[i][j] == 'N' else grid_state[i][j]
+            for j in range(len(grid_state[0]))
+        )
+        grid_display += row + "\n"
+    return grid_display
+
+HISTORY_CURSOR_FORMAT = "%Y%m%d%H%M%S"
+
+def format_history_page(rows, first_page=True):
+    if not rows:
+        return "You have no games yet." if first_page else "No older games."
+    lines = ["*Your Games*\n"]
+    for game_id, choice, prize_amount, prize_type, reward_success, timestamp in rows:
+        prize_display = f"{prize_amount:.3f} SOL" if prize_type == 'SOL' else f"{int(prize_amount)} SHARDS" if prize_type == 'SHARD' else "No prize"
+        status = " ✅" if prize_type and reward_success else " ⚠️" if prize_type else ""
+        lines.append(f"• `{game_id}` {choice} - {prize_display}{status} - {timestamp:%Y-%m-%d %H:%M}")
+    lines.append("\nUse /result <game_id> for details.")
+    return "\n".join(lines)
+
+def history_markup(timestamp, game_id):
+    cursor = f"history_{timestamp.strftime(HISTORY_CURSOR_FORMAT)}_{game_id}"
+    return InlineKeyboardMarkup([[InlineKeyboardButton("Older ▶", callback_data=cursor)]])
+
+def parse_history_cursor(data):
+    _, timestamp, game_id = data.split('_')
+    return datetime.datetime.strptime(timestamp, HISTORY_CURSOR_FORMAT), int(game_id)
+
+def format_stats(player, totals):
+    lines = ["*Your Stats*\n"]
+    if player:
+        plays, sol_won, shard_won, jackpot_hits, last_played = player
+        lines += [
+            f"• *Games Played:* {plays}",
+            f"• *SOL Won:* {sol_won:.3f}",
+            f"• *SHARDS Won:* {int(shard_won)}",
+            f"• *Jackpots Found:* {jackpot_hits}",
+            f"• *Last Played:* {last_played:%Y-%m-%d %H:%M}"
+        ]
+    else:
+        lines.append("You have no games yet.")
+    if totals:
+        plays, sol_won, shard_won, jackpot_hits = totals
+        lines += [
+            "\n*All Players*\n",
+            f"• *Games Played:* {plays}",
+            f"• *SOL Won:* {sol_won:.3f}",
+            f"• *SHARDS Won:* {int(shard_won)}",
+            f"• *Jackpots Found:* {jackpot_hits}"
+        ]
+    return "\n".join(lines)
+
+def format_leaderboard(rows):
+    if not rows:
+        return "No winners yet."
+    lines = ["*Leaderboard - SOL Won*\n"]
+    for rank, (user_id, sol_won, shard_won, plays) in enumerate(rows, start=1):
+        lines.append(f"{rank}. `{user_id}` - {sol_won:.3f} SOL, {int(shard_won)} SHARDS ({plays} games)")
+    return "\n".join(lines)
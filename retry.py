@@ -0,0 +1,95 @@
+import os
+import time
+import random
+import asyncio
+import inspect
+import logging
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', 5))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', 0.5))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', 8))
+RETRY_DEADLINE = float(os.getenv('RETRY_DEADLINE', 30))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', 30))
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+_breakers = {}
+
+def get_breaker(endpoint):
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        breaker = _breakers[endpoint] = CircuitBreaker()
+    return breaker
+
+async def _call(func, args, kwargs, timeout):
+    if inspect.iscoroutinefunction(func):
+        return await asyncio.wait_for(func(*args, **kwargs), timeout)
+    return await asyncio.wait_for(asyncio.to_thread(func, *args, **kwargs), timeout)
+
+async def retry_async(func, *args, endpoint=None, max_attempts=RETRY_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY,
+                      max_delay=RETRY_MAX_DELAY, deadline=RETRY_DEADLINE, retry_on=(Exception,), **kwargs):
+    breaker = get_breaker(endpoint) if endpoint else None
+    give_up_at = time.monotonic() + deadline
+    for attempt in range(max_attempts):
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {endpoint}")
+        remaining = give_up_at - time.monotonic()
+        try:
+            result = await _call(func, args, kwargs, remaining)
+        except retry_on + (asyncio.TimeoutError,) as e:
+            if breaker is not None:
+                breaker.record_failure()
+            logging.warning(f"RPC call failed on attempt {attempt + 1}: {str(e)}")
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            if attempt == max_attempts - 1 or time.monotonic() + delay >= give_up_at:
+                raise
+            await asyncio.sleep(delay)
+        except BaseException:
+            if breaker is not None:
+                breaker.probing = False
+            raise
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
@@ -0,0 +1,154 @@
+import os
+import json
+import asyncio
+import itertools
+import aiohttp
+import metrics
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+RPC_URL = os.getenv('INSERT_RPC')
+RPC_TIMEOUT = float(os.getenv('RPC_TIMEOUT', 10))
+RPC_POOL_SIZE = int(os.getenv('RPC_POOL_SIZE', 50))
+RPC_KEEPALIVE = float(os.getenv('RPC_KEEPALIVE', 60))
+RPC_BATCH_WINDOW = float(os.getenv('RPC_BATCH_WINDOW_MS', 5)) / 1000
+RPC_BATCH_MAX = int(os.getenv('RPC_BATCH_MAX', 100))
+
+BATCHABLE_METHODS = {"getBalance", "getTokenAccountsByOwner", "getMultipleAccounts"}
+
+rpc_requests = metrics.Counter("shards_rpc_requests_total", "Solana JSON-RPC requests by method and outcome", ("method", "outcome"))
+rpc_post_seconds = metrics.Histogram("shards_rpc_post_seconds", "Wall time of each HTTP POST to the RPC node, single or batched")
+
+headers = {"accept": "application/json", "content-type": "application/json"}
+
+_session = None
+_request_ids = itertools.count(1)
+
+class RPCError(Exception):
+    pass
+
+class RPCResponseError(RPCError):
+    def __init__(self, method, error):
+        super().__init__(f"{method}: {error}")
+        self.code = error.get("code") if isinstance(error, dict) else None
+
+def get_session():
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=RPC_POOL_SIZE, keepalive_timeout=RPC_KEEPALIVE, ttl_dns_cache=300)
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=RPC_TIMEOUT)
+        )
+    return _session
+
+async def close_session():
+    global _session
+    session = _session
+    _session = None
+    if session is not None and not session.closed:
+        await session.close()
+
+async def post_json(payload, url=None):
+    try:
+        with rpc_post_seconds.time():
+            async with get_session().post(url or RPC_URL, json=payload) as response:
+                if response.status != 200:
+                    raise RPCError(f"HTTP {response.status}: {await response.text()}")
+                try:
+                    return await response.json(content_type=None)
+                except ValueError as e:
+                    raise RPCError(f"Invalid JSON response: {(await response.text())[:200]!r}") from e
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise RPCError(f"{type(e).__name__}: {e}") from e
+
+def _result_of(method, body):
+    if "error" in body:
+        rpc_requests.inc(method=method, outcome="error")
+        raise RPCResponseError(method, body['error'])
+    rpc_requests.inc(method=method, outcome="ok")
+    return body.get("result")
+
+class RPCBatcher:
+    def __init__(self, window=RPC_BATCH_WINDOW, max_size=RPC_BATCH_MAX):
+        self.window = window
+        self.max_size = max_size
+        self._pending = {}
+        self._flush_handle = None
+        self._tasks = set()
+
+    def submit(self, method, params):
+        key = (method, json.dumps(params, sort_keys=True))
+        entry = self._pending.get(key)
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            entry = (method, params, loop.create_future())
+            self._pending[key] = entry
+            if len(self._pending) >= self.max_size:
+                self.flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.window, self.flush)
+        return entry[2]
+
+    def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._send(list(pending.values())))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, entries):
+        by_id = {}
+        payload = []
+        for method, params, future in entries:
+            request_id = next(_request_ids)
+            by_id[request_id] = (method, future)
+            payload.append({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        try:
+            body = await post_json(payload[0] if len(payload) == 1 else payload)
+            if isinstance(body, dict):
+                if len(payload) > 1:
+                    raise RPCError(f"Batch rejected: {body.get('error', body)}")
+                body = [body]
+        except RPCError as e:
+            for method, future in by_id.values():
+                rpc_requests.inc(method=method, outcome="transport")
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for response in body:
+            method, future = by_id.pop(response.get("id"), (None, None))
+            if future is None or future.done():
+                continue
+            try:
+                future.set_result(_result_of(method, response))
+            except RPCError as e:
+                future.set_exception(e)
+        for method, future in by_id.values():
+            rpc_requests.inc(method=method, outcome="missing")
+            if not future.done():
+                future.set_exception(RPCError(f"{method}: missing from batch response"))
+
+_batcher = RPCBatcher()
+
+async def rpc_call(method, params=None, url=None):
+    params = params or []
+    if url is None and method in BATCHABLE_METHODS and RPC_BATCH_WINDOW > 0:
+        return await asyncio.shield(_batcher.submit(method, params))
+    payload = {
+        "jsonrpc": "2.0",
+        "id": next(_request_ids),
+        "method": method,
+        "params": params
+    }
+    try:
+        body = await post_json(payload, url)
+    except RPCError:
+        rpc_requests.inc(method=method, outcome="transport")
+        raise
+    return _result_of(method, body)
@@ -0,0 +1,115 @@
+import time
+import argparse
+import numpy as np
+from game_rules import (
+    GAME_CONFIG,
+    TOKEN_PRIZE_OPTIONS,
+    JACKPOT_CHANCE,
+    JACKPOT_PAYOUT,
+    JACKPOT_SHARE,
+    JACKPOT_SHARE_REFERRAL
+)
+
+CELL_NOTHING = 0
+CELL_TOKEN = 1
+CELL_JACKPOT = 2
+
+def simulate_outcomes(rng, plays, size, nft_count, token_count):
+    cells = size * size
+    order = np.argsort(rng.random((plays, cells)), axis=1)
+    include_jackpot = (rng.random(plays) < JACKPOT_CHANCE) & (nft_count > 0)
+    grids = np.full((plays, cells), CELL_NOTHING, dtype=np.int8)
+    rows = np.arange(plays)
+    grids[rows[:, None], order[:, :min(token_count, cells)]] = CELL_TOKEN
+    grids[rows[include_jackpot], order[include_jackpot, -1]] = CELL_JACKPOT
+    choices = rng.integers(0, cells, plays)
+    return grids[rows, choices]
+
+def run_jackpot(inflows, hits, initial_jackpot):
+    cumulative = np.concatenate(([0.0], np.cumsum(inflows)))
+    hit_index = np.flatnonzero(hits)
+    payouts = np.empty(len(hit_index))
+    after_hit = np.empty(len(hit_index))
+    balance = initial_jackpot
+    previous = 0
+    for n, index in enumerate(hit_index):
+        balance += cumulative[index + 1] - cumulative[previous]
+        payouts[n] = balance * JACKPOT_PAYOUT
+        balance -= payouts[n]
+        after_hit[n] = balance
+        previous = index + 1
+    final = balance + cumulative[-1] - cumulative[previous]
+    return payouts, after_hit, hit_index, cumulative, final
+
+def jackpot_curve(initial_jackpot, after_hit, hit_index, cumulative, sample_points):
+    balances = np.concatenate(([initial_jackpot], after_hit))
+    starts = np.concatenate(([0], hit_index + 1))
+    hits_so_far = np.searchsorted(hit_index, sample_points, side='right')
+    return balances[hits_so_far] + cumulative[sample_points + 1] - cumulative[starts[hits_so_far]]
+
+def simulate(plays, batch_size=250000, referral_rate=0.0, initial_jackpot=0.0, curve_points=20, seed=None, config=None):
+    if plays < 1:
+        raise ValueError(f"plays must be at least 1, got {plays}")
+    config = config or GAME_CONFIG["grid"]
+    rng = np.random.default_rng(seed)
+    prizes = np.asarray(TOKEN_PRIZE_OPTIONS, dtype=np.int64)
+    outcomes = np.empty(plays, dtype=np.int8)
+    token_wins = np.zeros(plays, dtype=np.int64)
+    referred = np.empty(plays, dtype=bool)
+    for start in range(0, plays, batch_size):
+        count = min(batch_size, plays - start)
+        chunk = simulate_outcomes(rng, count, config["size"], config["nft_count"], config["token_count"])
+        outcomes[start:start + count] = chunk
+        is_token = chunk == CELL_TOKEN
+        token_wins[start:start + count][is_token] = rng.choice(prizes, int(is_token.sum()))
+        referred[start:start + count] = rng.random(count) < referral_rate
+    entry_fee = config["entry_fee"]
+    inflows = np.where(referred, entry_fee * JACKPOT_SHARE_REFERRAL, entry_fee * JACKPOT_SHARE)
+    payouts, after_hit, hit_index, cumulative, final = run_jackpot(inflows, outcomes == CELL_JACKPOT, initial_jackpot)
+    sample_points = np.unique(np.linspace(0, plays - 1, curve_points).astype(np.int64))
+    curve = jackpot_curve(initial_jackpot, after_hit, hit_index, cumulative, sample_points)
+    wagered = plays * entry_fee
+    return {
+        "plays": plays,
+        "wagered_sol": wagered,
+        "jackpot_hits": len(hit_index),
+        "jackpot_paid_sol": float(payouts.sum()),
+        "jackpot_avg_sol": float(payouts.mean()) if len(payouts) else 0.0,
+        "jackpot_final_sol": float(final),
+        "rtp": float(payouts.sum()) / wagered if wagered else 0.0,
+        "token_wins": int((outcomes == CELL_TOKEN).sum()),
+        "shard_emitted": int(token_wins.sum()),
+        "shard_per_1000_plays": float(token_wins.sum()) * 1000 / plays if plays else 0.0,
+        "jackpot_curve": list(zip((sample_points + 1).tolist(), curve.tolist())),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of SHARDS grid economics")
+    parser.add_argument("--plays", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=250000)
+    parser.add_argument("--referral-rate", type=float, default=0.0)
+    parser.add_argument("--initial-jackpot", type=float, default=0.0)
+    parser.add_argument("--curve-points", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if args.plays < 1:
+        parser.error("--plays must be at least 1")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    started = time.perf_counter()
+    report = simulate(args.plays, args.batch_size, args.referral_rate, args.initial_jackpot, args.curve_points, args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"Plays: {report['plays']} ({elapsed:.2f}s)")
+    print(f"Wagered: {report['wagered_sol']:.3f} SOL")
+    print(f"Jackpot hits: {report['jackpot_hits']} (avg {report['jackpot_avg_sol']:.3f} SOL)")
+    print(f"Jackpot paid: {report['jackpot_paid_sol']:.3f} SOL")
+    print(f"Jackpot at end: {report['jackpot_final_sol']:.3f} SOL")
+    print(f"RTP (SOL): {report['rtp'] * 100:.2f}%")
+    print(f"Token wins: {report['token_wins']}")
+    print(f"SHARD emitted: {report['shard_emitted']} ({report['shard_per_1000_plays']:.0f} per 1,000 plays)")
+    print("Jackpot growth:")
+    for play, balance in report["jackpot_curve"]:
+        print(f"  {play:>10} {balance:.3f} SOL")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import db
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')
+STATE_REDIS_URL = os.getenv('STATE_REDIS_URL', 'redis://localhost:6379/0')
+STATE_SWEEP_EVERY = int(os.getenv('STATE_SWEEP_EVERY', 1000))
+
+class MemoryStateStore:
+    def __init__(self):
+        self._data = {}
+        self._writes = 0
+
+    async def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key, value, ttl=None):
+        self._data[key] = (value, time.time() + ttl if ttl else None)
+        self._writes += 1
+        if self._writes % STATE_SWEEP_EVERY == 0:
+            now = time.time()
+            for expired in [k for k, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]:
+                del self._data[expired]
+
+    async def delete(self, key):
+        self._data.pop(key, None)
+
+class MySQLStateStore:
+    def __init__(self):
+        self._writes = 0
+
+    async def get(self, key):
+        async with db.cursor() as cursor:
+            await cursor.execute(
+                "SELECT value FROM session_state WHERE state_key = %s AND (expires_at IS NULL OR expires_at > %s)",
+                (key, time.time())
+            )
+            result = await cursor.fetchone()
+            return json.loads(result[0]) if result else None
+
+    async def set(self, key, value, ttl=None):
+        async with db.cursor() as cursor:
+            await cursor.execute(
+                '''
+                INSERT INTO session_state (state_key, value, expires_at)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE value = VALUES(value), expires_at = VALUES(expires_at)
+                ''',
+                (key, json.dumps(value), time.time() + ttl if ttl else None)
+            )
+            self._writes += 1
+            if self._writes % STATE_SWEEP_EVERY == 0:
+                await cursor.execute("DELETE FROM session_state WHERE expires_at <= %s", (time.time(),))
+
+    async def delete(self, key):
+        async with db.cursor() as cursor:
+            await cursor.execute("DELETE FROM session_state WHERE state_key = %s", (key,))
+
+class RedisStateStore:
+    def __init__(self, url=STATE_REDIS_URL):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+
+    async def get(self, key):
+        value = await self._redis.get(key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key, value, ttl=None):
+        await self._redis.set(key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    async def delete(self, key):
+        await self._redis.delete(key)
+
+STATE_BACKENDS = {
+    "memory": MemoryStateStore,
+    "mysql": MySQLStateStore,
+    "redis": RedisStateStore,
+}
+
+def create_state_store(backend=STATE_BACKEND):
+    if backend not in STATE_BACKENDS:
+        raise ValueError(f"Unknown STATE_BACKEND {backend!r}, expected one of {', '.join(STATE_BACKENDS)}")
+    return STATE_BACKENDS[backend]()
+
+state_store = create_state_store()
@@ -0,0 +1,102 @@
+import json
+import db
+
+LEADERBOARD_SIZE = 10
+
+UPSERT_PLAYER_STATS = '''
+    INSERT INTO player_stats (user_id, plays, sol_won, shard_won, jackpot_hits, last_played)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        plays = plays + VALUES(plays),
+        sol_won = sol_won + VALUES(sol_won),
+        shard_won = shard_won + VALUES(shard_won),
+        jackpot_hits = jackpot_hits + VALUES(jackpot_hits),
+        last_played = GREATEST(COALESCE(last_played, VALUES(last_played)), VALUES(last_played))
+'''
+
+BACKFILL_PLAYER_STATS = '''
+    INSERT INTO player_stats (user_id, plays, sol_won, shard_won, jackpot_hits, last_played)
+    SELECT user_id, plays, sol_won, shard_won, jackpot_hits, last_played FROM (
+        SELECT
+            user_id,
+            COUNT(*) AS plays,
+            SUM(IF(prize_type = 'SOL' AND reward_success, prize_amount, 0)) AS sol_won,
+            SUM(IF(prize_type = 'SHARD' AND reward_success, prize_amount, 0)) AS shard_won,
+            SUM(JSON_UNQUOTE(JSON_EXTRACT(grid, CONCAT('$[', CAST(SUBSTRING(choice, 2) AS UNSIGNED) - 1, '][', ASCII(choice) - 65, ']'))) = 'N') AS jackpot_hits,
+            MAX(timestamp) AS last_played
+        FROM game_entries
+        GROUP BY user_id
+    ) AS totals
+'''
+
+BACKFILL_GLOBAL_STATS = '''
+    UPDATE global_stats, (
+        SELECT COALESCE(SUM(plays), 0) AS plays, COALESCE(SUM(sol_won), 0) AS sol_won,
+               COALESCE(SUM(shard_won), 0) AS shard_won, COALESCE(SUM(jackpot_hits), 0) AS jackpot_hits
+        FROM player_stats
+    ) AS totals
+    SET global_stats.plays = totals.plays,
+        global_stats.sol_won = totals.sol_won,
+        global_stats.shard_won = totals.shard_won,
+        global_stats.jackpot_hits = totals.jackpot_hits
+    WHERE global_stats.id = 1
+'''
+
+def is_jackpot_hit(choice, grid_json):
+    grid = json.loads(grid_json)
+    return grid[int(choice[1:]) - 1][ord(choice[0]) - ord('A')] == 'N'
+
+def aggregate(rows):
+    players = {}
+    for game_id, user_id, _, choice, grid_json, reward_success, prize_amount, prize_type, timestamp in rows:
+        stats = players.setdefault(user_id, [user_id, 0, 0.0, 0.0, 0, timestamp])
+        stats[1] += 1
+        if reward_success and prize_type == 'SOL':
+            stats[2] += prize_amount
+        elif reward_success and prize_type == 'SHARD':
+            stats[3] += prize_amount
+        if is_jackpot_hit(choice, grid_json):
+            stats[4] += 1
+        stats[5] = max(stats[5], timestamp)
+    return [tuple(stats) for stats in players.values()]
+
+async def apply_stats(cursor, rows):
+    players = aggregate(rows)
+    if not players:
+        return
+    await cursor.executemany(UPSERT_PLAYER_STATS, players)
+    await cursor.execute(
+        '''
+        UPDATE global_stats
+        SET plays = plays + %s, sol_won = sol_won + %s, shard_won = shard_won + %s, jackpot_hits = jackpot_hits + %s
+        WHERE id = 1
+        ''',
+        (sum(p[1] for p in players), sum(p[2] for p in players), sum(p[3] for p in players), sum(p[4] for p in players))
+    )
+
+async def backfill_stats(cursor):
+    await cursor.execute("INSERT IGNORE INTO global_stats (id) VALUES (1)")
+    if cursor.rowcount == 1:
+        await cursor.execute(BACKFILL_PLAYER_STATS)
+        await cursor.execute(BACKFILL_GLOBAL_STATS)
+
+async def get_user_stats(user_id):
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            "SELECT plays, sol_won, shard_won, jackpot_hits, last_played FROM player_stats WHERE user_id = %s",
+            (user_id,)
+        )
+        return await cursor.fetchone()
+
+async def get_global_stats():
+    async with db.cursor() as cursor:
+        await cursor.execute("SELECT plays, sol_won, shard_won, jackpot_hits FROM global_stats WHERE id = 1")
+        return await cursor.fetchone()
+
+async def get_leaderboard(limit=LEADERBOARD_SIZE):
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            "SELECT user_id, sol_won, shard_won, plays FROM player_stats ORDER BY sol_won DESC LIMIT %s",
+            (limit,)
+        )
+        return await cursor.fetchall()
@@ -0,0 +1,35 @@
+import sys
+import types
+import asyncio
+import unittest
+
+sys.modules.setdefault("db", types.ModuleType("db"))
+
+from ids import IdAllocator
+
+class FakeBlockAllocator(IdAllocator):
+    def __init__(self, block_size):
+        super().__init__("test", block_size=block_size)
+        self.next_block = 1000
+        self.reservations = 0
+
+    async def _reserve(self):
+        await asyncio.sleep(0.01)
+        self.reservations += 1
+        self._reserved = (self.next_block, self.next_block + self.block_size)
+        self.next_block += self.block_size
+
+class IdAllocatorTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_callers_beyond_one_block(self):
+        allocator = FakeBlockAllocator(block_size=100)
+        ids = await asyncio.gather(*(allocator.next_id() for _ in range(250)))
+        self.assertEqual(len(set(ids)), 250)
+        self.assertTrue(all(1000 <= game_id < allocator.next_block for game_id in ids))
+
+    async def test_ids_are_sequential_for_a_single_caller(self):
+        allocator = FakeBlockAllocator(block_size=10)
+        ids = [await allocator.next_id() for _ in range(35)]
+        self.assertEqual(ids, list(range(1000, 1035)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import logging
+import db
+from dotenv import load_dotenv
+from solders.pubkey import Pubkey
+from spl.token.instructions import get_associated_token_address
+from retry import retry_async
+from rpc import rpc_call, RPC_URL, RPCError
+
+load_dotenv('.env')
+
+MINT_ADDRESS = os.getenv('TOKEN_MINT_ADDRESS')
+
+mint = Pubkey.from_string(MINT_ADDRESS)
+
+_cache = {}
+
+async def _load_stored(owner):
+    try:
+        async with db.cursor() as cursor:
+            await cursor.execute("SELECT token_account FROM token_accounts WHERE owner = %s", (owner,))
+            result = await cursor.fetchone()
+            return result[0] if result else None
+    except Exception as e:
+        logging.error(f"Error loading token account for {owner}: {e}")
+        return None
+
+async def _store(owner, token_account):
+    try:
+        async with db.cursor() as cursor:
+            await cursor.execute(
+                '''
+                INSERT INTO token_accounts (owner, token_account)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE token_account = VALUES(token_account)
+                ''',
+                (owner, token_account)
+            )
+    except Exception as e:
+        logging.error(f"Error storing token account for {owner}: {e}")
+
+async def _is_mint_account(address):
+    result = await retry_async(rpc_call, "getMultipleAccounts", [[address], {"encoding": "jsonParsed"}], endpoint=RPC_URL, retry_on=(RPCError,))
+    account = result["value"][0]
+    if not account:
+        return False
+    parsed = account["data"].get("parsed", {}) if isinstance(account["data"], dict) else {}
+    return parsed.get("info", {}).get("mint") == MINT_ADDRESS
+
+async def _lookup(owner):
+    result = await retry_async(
+        rpc_call,
+        "getTokenAccountsByOwner",
+        [owner, {"mint": MINT_ADDRESS}, {"encoding": "jsonParsed"}],
+        endpoint=RPC_URL,
+        retry_on=(RPCError,)
+    )
+    if not result["value"]:
+        return None
+    return result["value"][0]["pubkey"]
+
+async def get_token_account(owner):
+    owner = str(owner)
+    token_account = _cache.get(owner)
+    if token_account is None:
+        token_account = await _load_stored(owner)
+        if token_account is None:
+            associated = str(get_associated_token_address(Pubkey.from_string(owner), mint))
+            if await _is_mint_account(associated):
+                token_account = associated
+            else:
+                token_account = await _lookup(owner)
+            if token_account is None:
+                raise LookupError(f"No token account for {owner}")
+            await _store(owner, token_account)
+        _cache[owner] = token_account
+    return Pubkey.from_string(token_account)
+
+async def forget_token_account(owner):
+    owner = str(owner)
+    _cache.pop(owner, None)
+    try:
+        async with db.cursor() as cursor:
+            await cursor.execute("DELETE FROM token_accounts WHERE owner = %s", (owner,))
+    except Exception as e:
+        logging.error(f"Error removing token account for {owner}: {e}")
@@ -0,0 +1,136 @@
+import os
+import sys
+import asyncio
+import importlib
+import logging
+import multiprocessing
+from aiohttp import web
+from dotenv import load_dotenv
+from telegram import Bot, Update
+
+load_dotenv('.env')
+
+TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', os.cpu_count() or 1))
+WORKER_CHECK_INTERVAL = 5
+
+def update_user_id(data):
+    for key, value in data.items():
+        if not isinstance(value, dict):
+            continue
+        user = value.get("from") or value.get("user")
+        if user:
+            return user["id"]
+        chat = value.get("chat") or value.get("message", {}).get("chat")
+        if chat:
+            return chat["id"]
+    return 0
+
+def shard_for(user_id, workers=WEBHOOK_WORKERS):
+    return abs(user_id) % workers
+
+def _main_module():
+    spawned_main = sys.modules.get("__mp_main__")
+    if getattr(spawned_main, "build_application", None) is not None:
+        sys.modules.setdefault("main", spawned_main)
+    return importlib.import_module("main")
+
+def build_worker(index, count):
+    application = _main_module().build_application(rate_shares=count)
+    application.bot_data["worker_index"] = index + 1
+    return application
+
+def run_worker(index, queue, count):
+    asyncio.run(_worker(index, queue, count))
+
+async def _worker(index, queue, count):
+    application = build_worker(index, count)
+    loop = asyncio.get_running_loop()
+    try:
+        async with application:
+            if application.post_init:
+                await application.post_init(application)
+            await application.start()
+            try:
+                while True:
+                    data = await loop.run_in_executor(None, queue.get)
+                    if data is None:
+                        break
+                    await application.update_queue.put(Update.de_json(data, application.bot))
+            finally:
+                await application.stop()
+                if application.post_stop:
+                    await application.post_stop(application)
+    finally:
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+    logging.info(f"Webhook worker {index} stopped")
+
+class WorkerPool:
+    def __init__(self, count=WEBHOOK_WORKERS):
+        self.context = multiprocessing.get_context('spawn')
+        self.queues = [self.context.Queue() for _ in range(count)]
+        self.processes = [None] * count
+
+    def _spawn(self, index):
+        process = self.context.Process(target=run_worker, args=(index, self.queues[index], len(self.queues)), daemon=True)
+        process.start()
+        self.processes[index] = process
+
+    def start(self):
+        for index in range(len(self.queues)):
+            self._spawn(index)
+
+    def revive(self):
+        for index, process in enumerate(self.processes):
+            if process is not None and not process.is_alive():
+                logging.error(f"Webhook worker {index} exited with {process.exitcode}, restarting")
+                self._spawn(index)
+
+    def dispatch(self, data):
+        self.queues[shard_for(update_user_id(data), len(self.queues))].put(data)
+
+    def stop(self):
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            if process is not None:
+                process.join(timeout=30)
+
+async def handle_update(request):
+    if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+        return web.Response(status=403)
+    data = await request.json()
+    request.app["workers"].dispatch(data)
+    return web.Response()
+
+async def _watch_workers(app):
+    while True:
+        await asyncio.sleep(WORKER_CHECK_INTERVAL)
+        app["workers"].revive()
+
+async def on_startup(app):
+    async with Bot(token=TOKEN) as bot:
+        await bot.set_webhook(url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET, allowed_updates=Update.ALL_TYPES, max_connections=1)
+    app["watcher"] = asyncio.create_task(_watch_workers(app))
+
+async def on_cleanup(app):
+    app["watcher"].cancel()
+
+def run_webhook():
+    workers = WorkerPool()
+    workers.start()
+    app = web.Application()
+    app["workers"] = workers
+    app.router.add_post(WEBHOOK_PATH, handle_update)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    try:
+        web.run_app(app, host=WEBHOOK_LISTEN, port=WEBHOOK_PORT)
+    finally:
+        workers.stop()